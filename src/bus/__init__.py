@@ -1,3 +1,4 @@
-from .software_spi import SoftwareSPI
+from .software_spi import SoftwareSPI, SpiTransaction
 from .output_pin import OutputPin
-
+from .input_pin import InputPin
+from .pin_state_lock import PinStateLock, pin_state_lock
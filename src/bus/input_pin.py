@@ -0,0 +1,51 @@
+# Same gpiod 1.6.4 bindings as OutputPin.
+import gpiod
+from config import ConfigurableEntity, TYPE_INPUT_PIN
+import atexit
+
+class InputPin(ConfigurableEntity):
+    def __init__(self, config : dict):
+        super().__init__(config, TYPE_INPUT_PIN)
+        self.gpio_device = str(config["gpio_device"])
+        self.line_offset = int(config["line"])
+        self.edge = str(config.get("edge", "falling")).lower()
+
+        match self.edge:
+            case "falling":
+                request_type = gpiod.LINE_REQ_EV_FALLING_EDGE
+            case "rising":
+                request_type = gpiod.LINE_REQ_EV_RISING_EDGE
+            case "both":
+                request_type = gpiod.LINE_REQ_EV_BOTH_EDGES
+            case _:
+                raise ValueError(f"Invalid edge '{self.edge}', expected 'falling', 'rising' or 'both'")
+
+        self.chip = gpiod.Chip(f"/dev/gpiochip{self.gpio_device}")
+        self.pin = self.chip.get_line(self.line_offset)
+        self.pin.request(
+            consumer = self.name,
+            type = request_type
+        )
+
+        atexit.register(self.__at_exit)
+
+    def is_high(self) -> bool:
+        return self.pin.get_value() == 1
+
+    def clear_events(self):
+        while self.pin.event_wait(sec = 0, nsec = 0):
+            self.pin.event_read()
+
+    def wait_for_edge(self, timeout_seconds : float) -> bool:
+        """Blocks until the configured edge occurs or the timeout passes. Returns True if an edge occurred."""
+        sec = int(timeout_seconds)
+        nsec = int((timeout_seconds - sec) * 1_000_000_000)
+
+        if not self.pin.event_wait(sec = sec, nsec = nsec):
+            return False
+
+        self.pin.event_read()
+        return True
+
+    def __at_exit(self):
+        self.pin.release()
@@ -0,0 +1,49 @@
+from .output_pin import OutputPin
+from collections import deque
+import threading
+
+class PinStateLock:
+    """Lets several holders drive shared output pins at the same time, as long as they all want the same pin values."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.states : dict[OutputPin, bool] = {}
+        self.holders : dict[OutputPin, int] = {}
+        self.waiting : deque[object] = deque()
+
+    def acquire(self, states : dict[OutputPin, bool]):
+        ticket = object()
+
+        with self.condition:
+            self.waiting.append(ticket)
+
+            # Waiters are served in order so a holder of the opposite state can't be starved
+            while self.waiting[0] is not ticket or not self.__is_compatible(states):
+                self.condition.wait()
+
+            self.waiting.popleft()
+
+            for pin, value in states.items():
+                if self.holders.get(pin, 0) == 0:
+                    if value:
+                        pin.set_high()
+                    else:
+                        pin.set_low()
+
+                    self.states[pin] = value
+
+                self.holders[pin] = self.holders.get(pin, 0) + 1
+
+            self.condition.notify_all()
+
+    def release(self, states : dict[OutputPin, bool]):
+        with self.condition:
+            for pin in states:
+                self.holders[pin] -= 1
+
+            self.condition.notify_all()
+
+    def __is_compatible(self, states : dict[OutputPin, bool]) -> bool:
+        return all(self.holders.get(pin, 0) == 0 or self.states[pin] == value for pin, value in states.items())
+
+pin_state_lock = PinStateLock()
@@ -1,6 +1,53 @@
 import spidev
+import ctypes
+import fcntl
 from config import ConfigurableEntity, TYPE_SOFTWARE_SPI
 
+# struct spi_ioc_transfer from linux/spi/spidev.h
+class SpiIocTransfer(ctypes.Structure):
+    _fields_ = [
+        ("tx_buf", ctypes.c_uint64),
+        ("rx_buf", ctypes.c_uint64),
+        ("len", ctypes.c_uint32),
+        ("speed_hz", ctypes.c_uint32),
+        ("delay_usecs", ctypes.c_uint16),
+        ("bits_per_word", ctypes.c_uint8),
+        ("cs_change", ctypes.c_uint8),
+        ("tx_nbits", ctypes.c_uint8),
+        ("rx_nbits", ctypes.c_uint8),
+        ("word_delay_usecs", ctypes.c_uint8),
+        ("pad", ctypes.c_uint8),
+    ]
+
+# The ioctl size field is 14 bits wide, and spidev limits a message to its buffer size (4096 bytes by default)
+SPI_IOC_MAX_TRANSFERS = 64
+SPI_IOC_MAX_BYTES = 4096
+
+def spi_ioc_message(count : int) -> int:
+    # _IOW(SPI_IOC_MAGIC, 0, char[SPI_MSGSIZE(count)])
+    size = ctypes.sizeof(SpiIocTransfer) * count
+    return (1 << 30) | (size << 16) | (ord('k') << 8)
+
+class SpiTransaction:
+    """A burst of SPI frames submitted with a single syscall. Chip select is released between frames."""
+    def __init__(self, spi : "SoftwareSPI"):
+        self.spi = spi
+        self.frames : list[list[int]] = []
+
+    def add(self, data : list[int]) -> int:
+        """Queues a frame and returns its index in the result of execute()."""
+        self.frames.append(data)
+        return len(self.frames) - 1
+
+    def execute(self) -> list[list[int]]:
+        frames = self.frames
+        self.frames = []
+
+        if len(frames) == 0:
+            return []
+
+        return self.spi.transfer_frames(frames)
+
 class SoftwareSPI(ConfigurableEntity):
     def __init__(self, config : dict):
         super().__init__(config, TYPE_SOFTWARE_SPI)
@@ -12,6 +59,59 @@ class SoftwareSPI(ConfigurableEntity):
         self.spi.open(self.bus, self.device)
         self.spi.max_speed_hz = self.max_speed_hz
         self.spi.mode = self.mode
+        self.batching_supported = True
 
     def transfer(self, data : list[int]) -> list[int]:
-        return self.spi.xfer(data)
\ No newline at end of file
+        return self.spi.xfer(data)
+
+    def transaction(self) -> SpiTransaction:
+        return SpiTransaction(self)
+
+    def transfer_frames(self, frames : list[list[int]]) -> list[list[int]]:
+        results : list[list[int]] = []
+        start = 0
+
+        while start < len(frames):
+            end = start
+            size = 0
+            while end < len(frames) and end - start < SPI_IOC_MAX_TRANSFERS and size + len(frames[end]) <= SPI_IOC_MAX_BYTES:
+                size += len(frames[end])
+                end += 1
+
+            # A single frame larger than the spidev buffer still has to go out on its own
+            end = max(end, start + 1)
+            results += self.__transfer_message(frames[start:end])
+            start = end
+
+        return results
+
+    def __transfer_message(self, frames : list[list[int]]) -> list[list[int]]:
+        if self.batching_supported:
+            try:
+                return self.__ioctl_message(frames)
+            except (AttributeError, OSError) as e:
+                self.logger.warning(f"Batched SPI transfers unavailable, falling back to one transfer per frame: {e}")
+                self.batching_supported = False
+
+        return [list(self.spi.xfer2(frame)) for frame in frames]
+
+    def __ioctl_message(self, frames : list[list[int]]) -> list[list[int]]:
+        transfers = (SpiIocTransfer * len(frames))()
+        buffers = []
+
+        for i, frame in enumerate(frames):
+            tx_buf = (ctypes.c_uint8 * len(frame))(*frame)
+            rx_buf = (ctypes.c_uint8 * len(frame))()
+            buffers.append((tx_buf, rx_buf))
+
+            transfers[i].tx_buf = ctypes.addressof(tx_buf)
+            transfers[i].rx_buf = ctypes.addressof(rx_buf)
+            transfers[i].len = len(frame)
+            transfers[i].speed_hz = self.max_speed_hz
+            transfers[i].bits_per_word = 8
+            # Deselect the chip between frames, but not after the last one (which would keep it selected)
+            transfers[i].cs_change = 1 if i < len(frames) - 1 else 0
+
+        fcntl.ioctl(self.spi.fileno(), spi_ioc_message(len(frames)), transfers)
+
+        return [list(rx_buf) for _, rx_buf in buffers]
@@ -3,6 +3,7 @@ from .configurable_entity import ConfigurableEntity
 
 TYPE_SOFTWARE_SPI = "software_spi"
 TYPE_OUTPUT_PIN = "output_pin"
+TYPE_INPUT_PIN = "input_pin"
 TYPE_RFID_READER = "rfid_reader"
 TYPE_EXPORTER = "exporter"
 TYPE_RUNTIME = "runtime"
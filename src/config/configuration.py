@@ -8,6 +8,20 @@ class Configuration(ConfigurableEntity):
         self.auto_read_mode = str(config.get("auto_read_mode", "false")).lower() == "true"
         self.read_interval_seconds = float(config.get("read_interval_seconds", 1))
         self.read_retries = int(config.get("retries", 3))
+        self.key_cache_size = int(config.get("key_cache_size", 32))
+        self.processor_affinity_size = int(config.get("processor_affinity_size", 64))
+        self.parallel_readers = str(config.get("parallel_readers", "true")).lower() == "true"
+        self.retry_max_interval_seconds = float(config.get("retry_max_interval_seconds", 2))
+        self.retry_backoff_factor = float(config.get("retry_backoff_factor", 2))
+        self.retry_jitter = float(config.get("retry_jitter", 0.2))
+        self.presence_check = str(config.get("presence_check", "true")).lower() == "true"
+        self.no_tag_retries = int(config.get("no_tag_retries", 3))
+        self.export_workers = int(config.get("export_workers", 2))
+        self.export_queue_size = int(config.get("export_queue_size", 32))
+        self.outbox_path = config.get("outbox_path", None)
+        self.outbox_retry_min_seconds = float(config.get("outbox_retry_min_seconds", 1))
+        self.outbox_retry_max_seconds = float(config.get("outbox_retry_max_seconds", 60))
+        self.export_drop_policy = str(config.get("export_drop_policy", "drop_oldest")).lower()
 
 def default_configuration() -> Configuration:
     return Configuration({
@@ -0,0 +1,381 @@
+from typing import Any, Callable
+from concurrent.futures import Future
+import json
+import logging
+import os
+import selectors
+import socket
+import threading
+import time
+from controllers.socket_watcher import SocketWatcher
+
+ETX = 0x03
+
+class MessageFramer:
+    """Splits the Moonraker socket stream into ETX terminated messages. Every received byte is scanned only once."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.scanned = 0
+
+    def feed(self, data : bytes) -> list[bytes]:
+        self.buffer += data
+        messages = []
+        start = 0
+
+        while True:
+            end = self.buffer.find(ETX, self.scanned)
+            if end == -1:
+                break
+
+            messages.append(bytes(self.buffer[start:end]))
+            start = end + 1
+            self.scanned = start
+
+        self.scanned = len(self.buffer)
+
+        # Drop the consumed messages in one go, only the unfinished tail is moved
+        if start > 0:
+            del self.buffer[:start]
+            self.scanned -= start
+
+        return messages
+
+    def reset(self):
+        self.buffer.clear()
+        self.scanned = 0
+
+class MoonrakerConnection:
+    """One socket to Moonraker, shared by every controller using the same socket path.
+
+    Responses resolve the future of the request with the same id, notifications go to whoever subscribed to their method."""
+
+    def __init__(self, socket_path : str):
+        self.socket_path = socket_path
+        self.logger = logging.getLogger(f"moonraker:{socket_path}")
+        self.socket : socket.socket|None = None
+        self.framer = MessageFramer()
+        self.outgoing = bytearray()
+        self.outgoing_lock = threading.Lock()
+        self.retry_at = 0.0
+        self.retry_delay = 0.0
+        self.event_loop : "MoonrakerEventLoop|None" = None
+        self.connect_handlers : list[Callable[[], None]] = []
+        self.subscriptions : dict[str, list[Callable[[Any], None]]] = {}
+        self.pending : dict[int, Future[dict]] = {}
+        self.pending_lock = threading.Lock()
+        self.next_id = 1
+
+    def add_connect_handler(self, handler : Callable[[], None]):
+        """Call the handler every time the connection is (re)established."""
+        self.connect_handlers.append(handler)
+
+    def subscribe(self, method : str, handler : Callable[[Any], None]):
+        """Call the handler for every notification with the given method."""
+        self.subscriptions.setdefault(method, []).append(handler)
+
+    def request(self, message : dict) -> Future[dict]:
+        """Send a JSON-RPC request with a fresh id. The returned future resolves to the response message once it arrives,
+        or fails with a ConnectionError if the connection is lost first."""
+        future : Future[dict] = Future()
+
+        if self.socket is None:
+            future.set_exception(ConnectionError("Not connected to Moonraker"))
+            return future
+
+        with self.pending_lock:
+            request_id = self.next_id
+            self.next_id += 1
+            self.pending[request_id] = future
+
+        self.send({**message, "id": request_id})
+        return future
+
+    def on_connect(self):
+        for handler in self.connect_handlers:
+            # Every controller on this connection gets to set itself up, whatever another one does
+            try:
+                handler()
+            except Exception as e:
+                self.logger.exception(f"Error in Moonraker connect handler: {e}")
+
+    def on_message(self, message : Any):
+        if not isinstance(message, dict):
+            return
+
+        if "id" in message and ("result" in message or "error" in message):
+            with self.pending_lock:
+                future = self.pending.pop(message["id"], None)
+
+            # Done callbacks run here, on the event loop thread
+            if future is not None:
+                future.set_result(message)
+            return
+
+        for handler in self.subscriptions.get(message.get("method", None), []):
+            # A failing controller must not take the shared connection down for the others
+            try:
+                handler(message)
+            except Exception as e:
+                self.logger.exception(f"Error handling {message.get('method')} notification: {e}")
+
+    def connect(self) -> bool:
+        if not os.path.exists(self.socket_path):
+            self.logger.warning(f"Moonraker socket not found at {self.socket_path}")
+            return False
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            self.logger.error(f"Failed to connect to Moonraker socket: {e}")
+            sock.close()
+            return False
+
+        sock.setblocking(False)
+        self.socket = sock
+        self.framer.reset()
+
+        with self.outgoing_lock:
+            self.outgoing.clear()
+
+        return True
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+        # Responses to these will never arrive
+        with self.pending_lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+
+        for future in pending:
+            future.set_exception(ConnectionError("Moonraker connection closed"))
+
+    def is_connected(self) -> bool:
+        return self.socket is not None
+
+    def wants_write(self) -> bool:
+        with self.outgoing_lock:
+            return len(self.outgoing) > 0
+
+    def send(self, message : Any):
+        if self.socket is None:
+            self.logger.warning("Not connected to Moonraker, dropping message")
+            return
+
+        with self.outgoing_lock:
+            self.outgoing += json.dumps(message).encode("utf-8") + b'\x03'
+
+        if self.event_loop is not None:
+            self.event_loop.wake()
+
+    def handle_read(self):
+        assert self.socket is not None
+
+        data = self.socket.recv(65536)
+        if not data:
+            raise ConnectionError("Moonraker socket connection closed")
+
+        for message_data in self.framer.feed(data):
+            try:
+                message = json.loads(message_data.decode("utf-8").strip())
+            except json.JSONDecodeError as e:
+                self.logger.error(f"Failed to decode JSON message: {e}")
+                continue
+
+            self.on_message(message)
+
+    def handle_write(self):
+        assert self.socket is not None
+
+        with self.outgoing_lock:
+            if len(self.outgoing) == 0:
+                return
+
+            sent = self.socket.send(self.outgoing)
+            del self.outgoing[:sent]
+
+class MoonrakerEventLoop:
+    """Serves every Moonraker connection from a single thread using a selector.
+
+    Failed connections are retried with exponential backoff, and right away when their socket file shows up."""
+
+    def __init__(self, retry_min_seconds : float = 0.5, retry_max_seconds : float = 30):
+        self.retry_min_seconds = retry_min_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.selector = selectors.DefaultSelector()
+        self.connections : list[MoonrakerConnection] = []
+        self.lock = threading.Lock()
+        self.running = False
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_reader.setblocking(False)
+        self.wakeup_writer.setblocking(False)
+        self.selector.register(self.wakeup_reader, selectors.EVENT_READ, None)
+        self.watcher = SocketWatcher()
+
+        if self.watcher.is_available():
+            self.selector.register(self.watcher, selectors.EVENT_READ, self.watcher)
+
+    def connection(self, socket_path : str) -> MoonrakerConnection:
+        """Return the connection for the socket path, creating it on first use."""
+        with self.lock:
+            for connection in self.connections:
+                if connection.socket_path == socket_path:
+                    return connection
+
+            connection = MoonrakerConnection(socket_path)
+            connection.event_loop = self
+            self.connections.append(connection)
+
+            # Without a watch the connection still comes up, just on the next backoff retry
+            self.watcher.watch(os.path.dirname(os.path.abspath(socket_path)))
+
+        self.wake()
+        return connection
+
+    def wake(self):
+        try:
+            self.wakeup_writer.send(b"\x00")
+        except BlockingIOError:
+            # Already a wakeup pending
+            pass
+
+    def run(self):
+        """Run the event loop on the calling thread. Returns right away if another thread already runs it."""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+
+        while True:
+            try:
+                self.__run_once()
+            except Exception as e:
+                # Nothing restarts this thread, so start every connection over instead of giving up on all of them
+                logging.exception(f"Error in Moonraker event loop: {e}")
+
+                with self.lock:
+                    connections = list(self.connections)
+
+                for connection in connections:
+                    self.__disconnect(connection)
+
+                # Keeps a persistent failure from spinning the thread
+                time.sleep(self.retry_min_seconds)
+
+    def __run_once(self):
+        self.__connect_pending()
+
+        for key, mask in self.selector.select(self.__next_timeout()):
+            if key.data is None:
+                self.__drain_wakeups()
+                continue
+
+            if key.data is self.watcher:
+                self.__socket_created(self.watcher.read_paths())
+                continue
+
+            connection : MoonrakerConnection = key.data
+
+            try:
+                if mask & selectors.EVENT_READ:
+                    connection.handle_read()
+                if mask & selectors.EVENT_WRITE and connection.is_connected():
+                    connection.handle_write()
+            except Exception as e:
+                connection.logger.error(f"Error on Moonraker connection: {e}")
+                self.__disconnect(connection)
+
+        self.__update_interest()
+
+    def __connect_pending(self):
+        now = time.monotonic()
+
+        with self.lock:
+            connections = list(self.connections)
+
+        for connection in connections:
+            if connection.is_connected() or connection.retry_at > now:
+                continue
+
+            try:
+                if not connection.connect():
+                    self.__retry_later(connection)
+                    continue
+
+                connection.retry_delay = 0
+                self.selector.register(connection.socket, selectors.EVENT_READ, connection) # type: ignore
+                connection.on_connect()
+            except Exception as e:
+                connection.logger.exception(f"Error while setting up Moonraker connection: {e}")
+                self.__disconnect(connection)
+
+    def __disconnect(self, connection : MoonrakerConnection):
+        if connection.socket is not None:
+            try:
+                self.selector.unregister(connection.socket)
+            except (KeyError, ValueError):
+                # Failed before it was registered
+                pass
+
+        connection.close()
+        self.__retry_later(connection)
+
+    def __retry_later(self, connection : MoonrakerConnection):
+        connection.retry_delay = min(self.retry_max_seconds, max(self.retry_min_seconds, connection.retry_delay * 2))
+        connection.retry_at = time.monotonic() + connection.retry_delay
+        connection.logger.info(f"Retrying connection in {connection.retry_delay:.1f} seconds...")
+
+    def __socket_created(self, paths : list[str]):
+        with self.lock:
+            connections = list(self.connections)
+
+        for connection in connections:
+            if connection.is_connected() or os.path.abspath(connection.socket_path) not in paths:
+                continue
+
+            # Moonraker is (re)starting, connect now and start the backoff over in case it is not listening yet
+            connection.logger.info("Moonraker socket appeared, connecting")
+            connection.retry_at = 0
+            connection.retry_delay = 0
+
+    def __update_interest(self):
+        with self.lock:
+            connections = list(self.connections)
+
+        for connection in connections:
+            if not connection.is_connected():
+                continue
+
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if connection.wants_write() else 0)
+
+            try:
+                if self.selector.get_key(connection.socket).events != events: # type: ignore
+                    self.selector.modify(connection.socket, events, connection) # type: ignore
+            except (KeyError, ValueError, OSError) as e:
+                connection.logger.error(f"Error on Moonraker connection: {e}")
+                self.__disconnect(connection)
+
+    def __next_timeout(self) -> float | None:
+        now = time.monotonic()
+
+        with self.lock:
+            retries = [connection.retry_at - now for connection in self.connections if not connection.is_connected()]
+
+        if len(retries) == 0:
+            return None
+
+        return max(0, min(retries))
+
+    def __drain_wakeups(self):
+        try:
+            while self.wakeup_reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+moonraker_event_loop = MoonrakerEventLoop()
@@ -1,60 +1,48 @@
 from controllers.controller import Controller
-import socket
+from controllers.moonraker_client import moonraker_event_loop
 from abc import abstractmethod
-import json
-from typing import Any
-import os
-import time
+from concurrent.futures import Future
+from typing import Any, Callable
 
 class MoonrakerController(Controller):
     def __init__(self, config: dict):
         super().__init__(config)
         self.moonraker_socket_path = str(config["moonraker_socket_path"])
-        self.socket : socket.socket|None = None
-        self.buffer = b""
-    
-    def __loop_inner(self):
-        if self.socket is not None:
-            self.socket.close()
+        # Controllers using the same socket path share one connection
+        self.connection = moonraker_event_loop.connection(self.moonraker_socket_path)
+        self.connection.add_connect_handler(self.on_connect)
 
-        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        if not os.path.exists(self.moonraker_socket_path):
-            self.logger.warning(f"Moonraker socket not found at {self.moonraker_socket_path}")
-            return
+    def loop(self):
+        # All Moonraker controllers share one event loop thread, whichever controller gets here first runs it
+        moonraker_event_loop.run()
 
-        self.socket.connect(self.moonraker_socket_path)
-        time.sleep(0.1)
-        self.on_connect()
-        
-        while True:
-            data = self.socket.recv(4096)
-            if not data:
-                raise Exception("Moonraker socket connection closed")
-            
-            self.buffer += data
+    def send_message(self, message: Any):
+        self.connection.send(message)
 
-            while b'\x03' in self.buffer:
-                message_data, self.buffer = self.buffer.split(b'\x03', 1)
-                try:
-                    message = json.loads(message_data.decode("utf-8").strip())
-                    self.on_message(message)
-                except json.JSONDecodeError as e:
-                    self.logger.error(f"Failed to decode JSON message: {e}")
-                    continue
+    def send_request(self, message: dict, on_result: Callable[[Any], None]|None = None) -> Future[dict]:
+        """Send a request and pass the result of its response to on_result. Errors and lost connections are logged instead."""
+        future = self.connection.request(message)
 
-    def loop(self):
-        while True:
-            try:
-                self.__loop_inner()
-            except Exception as e:
-                self.logger.error(f"Error in MoonrakerController loop: {e}")
+        def on_done(done: Future[dict]):
+            exception = done.exception()
+            if exception is not None:
+                self.logger.warning(f"{message['method']} failed: {exception}")
+                return
 
-            self.logger.info("Retrying connection in 5 seconds...")
-            time.sleep(5)
+            response = done.result()
+            if "error" in response:
+                self.logger.error(f"{message['method']} failed: {response['error']}")
+                return
 
-    def send_message(self, message: Any):
-        message_str = json.dumps(message)
-        self.socket.sendall(message_str.encode("utf-8") + b'\x03')
+            if on_result is not None:
+                on_result(response.get("result", {}))
+
+        future.add_done_callback(on_done)
+        return future
+
+    def subscribe(self, method: str):
+        """Pass notifications with the given method to on_message."""
+        self.connection.subscribe(method, self.on_message)
 
     def on_connect(self):
         """Called when the socket connection is established."""
@@ -62,5 +50,5 @@ class MoonrakerController(Controller):
 
     @abstractmethod
     def on_message(self, message: Any):
-        """Handle a message received from the Moonraker socket."""
-        raise NotImplementedError("Subclasses must implement this method")
\ No newline at end of file
+        """Handle a subscribed notification received from the Moonraker socket."""
+        raise NotImplementedError("Subclasses must implement this method")
@@ -3,30 +3,36 @@ import socket
 import json
 import time
 import os
+from typing import Any
 
 from controllers.moonraker_controller import MoonrakerController
+from controllers.value_diff import SlotDebouncer, ValueDiff
 from runtime import Runtime
 
-MESSAGE_ID_WEBHOOK_QUERY = 348894590
-MESSAGE_ID_SUBSCRIBE = 84758249
-
 class MoonrakerOnPropertyChangeController(MoonrakerController):
     def __init__(self, config: dict):
         super().__init__(config)
         self.runtime : Runtime
         self.track_object = str(config["track_object"])
-        self.track_field = str(config["track_field"])
+        # A dotted track_field walks into the value of its first part, e.g. "state.lanes"
+        track_path = str(config["track_field"]).split(".")
+        self.track_field = track_path[0]
         self.get_index_from_field = str(config["get_index_from_field"])
         self.act_on_value = config.get("act_on_value", None)
+        self.debounce_seconds = float(config.get("debounce_seconds", 0))
         self.klippy_ready = False
-        self.current_value = None
+        self.current_value : dict[int, Any] | None = None
+        self.diff = ValueDiff(self.get_index_from_field, track_path[1:], self.act_on_value)
+        self.debouncer = SlotDebouncer(self.debounce_seconds, self.on_slot_settled) if self.debounce_seconds > 0 else None
 
-        # Array: Compare the arrays from old and new, all different indexes are taken as slots
+        for method in ["notify_klippy_disconnected", "notify_klippy_shutdown", "notify_klippy_ready", "notify_status_update"]:
+            self.subscribe(method)
 
-        if self.get_index_from_field not in ["array"]:
-            raise ValueError(f"Invalid field type: {self.get_index_from_field}")
+        # Array: Compare the arrays from old and new, all different indexes are taken as slots
+        # Dict: Compare the dicts from old and new, all different numeric keys are taken as slots
 
     def on_connect(self):
+        self.klippy_ready = False
         self.send_server_query()
 
     def on_message(self, message: dict):
@@ -34,30 +40,10 @@ class MoonrakerOnPropertyChangeController(MoonrakerController):
         if message is None:
             return
         
-        if "id" in message:
-            if message["id"] == MESSAGE_ID_WEBHOOK_QUERY:
-                result = message.get("result", {})
-                klippy_state = result.get("klippy_state", None)
-                if klippy_state is not None:
-                    self.klippy_ready = klippy_state == "ready"
-                    if self.klippy_ready:
-                        self.logger.debug("Klippy is ready, sending subscribe command...")
-                        self.send_subscribe_command()
-            elif message["id"] == MESSAGE_ID_SUBSCRIBE:
-                result = message.get("result", {})
-                status = result.get("status", {})
-                tracked_object = status.get(self.track_object, {})
-                tracked_field = tracked_object.get(self.track_field, None)
-                if tracked_field is not None:
-                    self.current_value = None
-                    self.handle_diff(tracked_field)
-                    self.current_value = tracked_field
-                    self.logger.info(f"Initial value for tracked field set to: {self.current_value}")
-        elif "method" in message:
+        if "method" in message:
             if message["method"] == "notify_klippy_disconnected" or message["method"] == "notify_klippy_shutdown":
-                self.logger.warning("Klippy disconnected, resetting state")
+                self.logger.warning("Klippy disconnected, waiting for it to come back")
                 self.klippy_ready = False
-                self.current_value = None
             elif message["method"] == "notify_klippy_ready":
                 self.logger.debug("Klippy is ready, sending subscribe command...")
                 self.klippy_ready = True
@@ -73,11 +59,18 @@ class MoonrakerOnPropertyChangeController(MoonrakerController):
     def send_server_query(self):
         query_message = {
             "jsonrpc": "2.0",
-            "method": "server.info",
-            "id": MESSAGE_ID_WEBHOOK_QUERY
+            "method": "server.info"
         }
 
-        self.send_message(query_message)
+        self.send_request(query_message, self.on_server_info)
+
+    def on_server_info(self, result: dict):
+        klippy_state = result.get("klippy_state", None)
+        if klippy_state is not None:
+            self.klippy_ready = klippy_state == "ready"
+            if self.klippy_ready:
+                self.logger.debug("Klippy is ready, sending subscribe command...")
+                self.send_subscribe_command()
 
     def send_subscribe_command(self):
         subscribe_message = {
@@ -87,35 +80,45 @@ class MoonrakerOnPropertyChangeController(MoonrakerController):
                 "objects": {
                     self.track_object: [self.track_field]
                 }
-            },
-            "id": MESSAGE_ID_SUBSCRIBE
+            }
         }
 
-        self.send_message(subscribe_message)
+        self.send_request(subscribe_message, self.on_subscribed)
+
+    def on_subscribed(self, result: dict):
+        status = result.get("status", {})
+        tracked_object = status.get(self.track_object, {})
+        tracked_field = tracked_object.get(self.track_field, None)
+        if tracked_field is not None:
+            # Diff against the value from before a Moonraker or Klippy restart, so slots that changed in the meantime still get read
+            self.handle_diff(tracked_field)
+            self.logger.info(f"Initial value for tracked field set to: {self.current_value}")
 
     def handle_diff(self, new):
-        # TODO : This could be better
-        if self.get_index_from_field == "array":
-            if self.current_value is not None:
-                if self.current_value == new and self.act_on_value is None:
-                    return
-                
-                if not isinstance(new, list) or not isinstance(self.current_value, list):
-                    self.logger.error("Expected array value for field but got non-array")
-                    return
-                
-                if len(new) != len(self.current_value):
-                    self.logger.warning("Array length changed, resetting state")
-                    self.current_value = new
-                    return
-            
-            changed_slots = []
-            
-            for i in range(len(new)):
-                if (self.current_value is None or new[i] != self.current_value[i]) and (self.act_on_value is None or str(new[i]) == self.act_on_value):
-                    changed_slots.append(i)
-
-            for changed_slot in changed_slots:
-                self.runtime.start_reading_tag(changed_slot)
-
-        self.current_value = new
\ No newline at end of file
+        if new is None:
+            return
+
+        new_slots = self.diff.extract(new)
+        if new_slots is None:
+            self.logger.error(f"Expected {self.get_index_from_field} value for field but got {type(new).__name__}")
+            return
+
+        old_slots = self.current_value
+        self.current_value = new_slots
+
+        for slot in self.diff.changed_slots(old_slots, new_slots):
+            old = old_slots.get(slot, None) if old_slots is not None else None
+
+            if self.debouncer is not None:
+                self.debouncer.change(slot, old, new_slots[slot])
+            elif self.diff.matches(new_slots[slot]):
+                self.runtime.start_reading_tag(slot)
+
+    def on_slot_settled(self, slot: int, old: Any, new: Any):
+        # Flipped back and forth during the debounce time, nothing to read
+        if old == new:
+            self.logger.debug(f"Slot {slot} settled back on {new}, skipping read")
+            return
+
+        if self.diff.matches(new):
+            self.runtime.start_reading_tag(slot)
@@ -15,8 +15,7 @@ MESSAGE_REGISTER_AGENT = {
         "version": "0.0.1",
         "type": "agent",
         "url": "https://github.com/suchmememanyskill/filament-detect"
-    },
-    "id": 4656
+    }
 }
 
 class MoonrakerRemoteMethodController(MoonrakerController):
@@ -24,12 +23,11 @@ class MoonrakerRemoteMethodController(MoonrakerController):
         super().__init__(config)
         self.remote_method_name = str(config["remote_method_name"])
         self.runtime : Runtime
+        self.subscribe(self.remote_method_name)
 
     def on_connect(self):
+        # The remote method can only be registered once Moonraker knows we are an agent
         self.send_register_agent()
-        time.sleep(0.1)
-        self.send_register_remote_command()
-        time.sleep(0.1)
 
     def on_message(self, message: dict):
         if "method" in message and message["method"] == self.remote_method_name:
@@ -39,7 +37,7 @@ class MoonrakerRemoteMethodController(MoonrakerController):
                 self.runtime.start_reading_tag(slot)
 
     def send_register_agent(self):
-        self.send_message(MESSAGE_REGISTER_AGENT)
+        self.send_request(MESSAGE_REGISTER_AGENT, lambda result: self.send_register_remote_command())
 
     def send_register_remote_command(self):
         message = {
@@ -50,4 +48,4 @@ class MoonrakerRemoteMethodController(MoonrakerController):
             }
         }
 
-        self.send_message(message)
\ No newline at end of file
+        self.send_request(message, lambda result: self.logger.info(f"Registered remote method {self.remote_method_name}"))
\ No newline at end of file
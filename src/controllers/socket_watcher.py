@@ -0,0 +1,72 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+
+IN_ATTRIB = 0x00000004
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+class SocketWatcher:
+    """Watches directories with inotify and reports the names of files that appear in them."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True) if libc_name else None
+        self.fd = -1
+        self.watches : dict[int, str] = {}
+
+        if self.libc is None or not hasattr(self.libc, "inotify_init1"):
+            logging.warning("inotify is not available, Moonraker reconnects fall back to polling")
+            return
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            logging.warning(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+
+    def is_available(self) -> bool:
+        return self.fd >= 0
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def watch(self, directory : str) -> bool:
+        if not self.is_available() or self.libc is None:
+            return False
+
+        if directory in self.watches.values():
+            return True
+
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CREATE | IN_MOVED_TO | IN_ATTRIB)
+        if wd < 0:
+            logging.warning(f"Failed to watch {directory}: {os.strerror(ctypes.get_errno())}")
+            return False
+
+        self.watches[wd] = directory
+        return True
+
+    def read_paths(self) -> list[str]:
+        """Return the paths created in the watched directories since the last call."""
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+
+        while offset + INOTIFY_EVENT_HEADER.size <= len(data):
+            wd, _, _, name_len = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\x00")
+            offset += name_len
+
+            if wd in self.watches and name:
+                paths.append(os.path.join(self.watches[wd], os.fsdecode(name)))
+
+        return paths
@@ -0,0 +1,87 @@
+from typing import Any, Callable
+import threading
+
+MISSING = object()
+
+class ValueDiff:
+    """Turns a tracked status value into a {slot: value} snapshot and finds the slots that changed between two snapshots.
+
+    The index type is either "array" (list index is the slot) or "dict" (numeric keys are the slot).
+    The path walks into nested objects or lists of the tracked field before the slots are taken."""
+
+    def __init__(self, index_type : str, path : list[str], act_on_value : str|None):
+        if index_type not in ["array", "dict"]:
+            raise ValueError(f"Invalid field type: {index_type}")
+
+        self.index_type = index_type
+        self.path = path
+
+        # Decided once here instead of on every element
+        if act_on_value is None:
+            self.matches : Callable[[Any], bool] = lambda value: True
+        else:
+            act_on_value = str(act_on_value)
+            self.matches = lambda value: str(value) == act_on_value
+
+    def extract(self, value : Any) -> dict[int, Any] | None:
+        for key in self.path:
+            if isinstance(value, dict):
+                value = value.get(key, None)
+            elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                value = value[int(key)]
+            else:
+                return None
+
+        if self.index_type == "array" and isinstance(value, list):
+            return dict(enumerate(value))
+
+        if self.index_type == "dict" and isinstance(value, dict):
+            return {int(slot): slot_value for slot, slot_value in value.items() if str(slot).isdigit()}
+
+        return None
+
+    def changed_slots(self, old : dict[int, Any] | None, new : dict[int, Any]) -> list[int]:
+        """Slots whose value differs from the old snapshot. Without an old snapshot every slot counts as changed, slots that disappeared are ignored."""
+        if old is None:
+            return list(new.keys())
+
+        return [slot for slot, value in new.items() if old.get(slot, MISSING) != value]
+
+class SlotDebouncer:
+    """Waits until a slot stopped changing for the given time before reporting it, together with the value from before the burst of changes."""
+
+    def __init__(self, seconds : float, on_settled : Callable[[int, Any, Any], None]):
+        self.seconds = seconds
+        self.on_settled = on_settled
+        self.lock = threading.Lock()
+        self.pending : dict[int, tuple[Any, Any, threading.Timer, int]] = {}
+        self.generation = 0
+
+    def change(self, slot : int, old : Any, new : Any):
+        with self.lock:
+            pending = self.pending.get(slot, None)
+
+            if pending is not None:
+                baseline, _, timer, _ = pending
+                timer.cancel()
+            else:
+                baseline = old
+
+            self.generation += 1
+            timer = threading.Timer(self.seconds, self.__settle, (slot, self.generation))
+            timer.daemon = True
+            self.pending[slot] = (baseline, new, timer, self.generation)
+            timer.start()
+
+    def __settle(self, slot : int, generation : int):
+        with self.lock:
+            pending = self.pending.get(slot, None)
+
+            # A change that came in while this timer was firing restarted the wait
+            if pending is None or pending[3] != generation:
+                return
+
+            del self.pending[slot]
+
+        baseline, latest, _, _ = pending
+        self.on_settled(slot, baseline, latest)
@@ -0,0 +1,168 @@
+from exporters.exporter import Exporter
+from exporters.outbox import ExportOutbox
+from filament.generic import GenericFilament
+from reader.rfid_reader import RfidReader
+from reader.scan_result import ScanResult
+from enum import Enum
+import logging
+import queue
+import threading
+import zlib
+
+class DropPolicy(Enum):
+    # Block the reader until there is room in the queue
+    BLOCK = "block"
+    # Discard the oldest queued export to make room for the new one
+    DROP_OLDEST = "drop_oldest"
+    # Discard the new export
+    DROP_NEWEST = "drop_newest"
+
+class ExportJob:
+    def __init__(self, exporter : Exporter, scan : ScanResult|None, filament : GenericFilament|None, reader : RfidReader, seq : int|None = None):
+        self.exporter = exporter
+        self.scan = scan
+        self.filament = filament
+        self.reader = reader
+        self.seq = seq
+
+class ExportDispatcher:
+    """Runs exporters on a pool of worker threads, so a slow exporter never holds up the readers.
+
+    Exports for the same target and slot always go to the same worker and are delivered in order, even across exporters.
+    With an outbox, exports are stored before they are attempted and failed ones are replayed until they go through."""
+
+    def __init__(self, worker_count : int, queue_size : int, drop_policy : DropPolicy, outbox : ExportOutbox|None = None, exporters : list[Exporter]|None = None, readers : list[RfidReader]|None = None):
+        self.worker_count = worker_count
+        self.drop_policy = drop_policy
+        self.outbox = outbox
+        # Only needed to resolve the names of stored exports when replaying them from the outbox
+        self.exporters = {exporter.name: exporter for exporter in (exporters or [])}
+        self.readers = {reader.name: reader for reader in (readers or [])}
+        self.outbox_changed = threading.Event()
+        self.queues : list[queue.Queue[ExportJob]] = [queue.Queue(maxsize=queue_size) for _ in range(worker_count)]
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+        for i, jobs in enumerate(self.queues):
+            threading.Thread(target=self.__worker, args=(jobs,), name=f"exporter-{i}", daemon=True).start()
+
+        if self.outbox is not None:
+            threading.Thread(target=self.__deliverer, name="exporter-outbox", daemon=True).start()
+
+    def submit(self, exporter : Exporter, scan : ScanResult|None, filament : GenericFilament|None, reader : RfidReader):
+        job = ExportJob(exporter, scan, filament, reader)
+
+        if self.outbox is not None:
+            job.seq = self.outbox.store(exporter.name, exporter.target(), reader.slot, reader.name, scan, filament)
+            self.outbox_changed.set()
+
+        with self.lock:
+            self.submitted += 1
+
+        self.__enqueue(job)
+
+    def __enqueue(self, job : ExportJob):
+        exporter = job.exporter
+        reader = job.reader
+
+        if self.worker_count <= 0:
+            self.__run(job)
+            return
+
+        # A stable hash, so the same target and slot always land on the same worker
+        shard = zlib.crc32(f"{exporter.target()}:{reader.slot}".encode("utf-8")) % self.worker_count
+        jobs = self.queues[shard]
+
+        match self.drop_policy:
+            case DropPolicy.BLOCK:
+                jobs.put(job)
+            case DropPolicy.DROP_NEWEST:
+                try:
+                    jobs.put_nowait(job)
+                except queue.Full:
+                    self.__drop(job)
+            case DropPolicy.DROP_OLDEST:
+                while True:
+                    try:
+                        jobs.put_nowait(job)
+                        break
+                    except queue.Full:
+                        pass
+
+                    try:
+                        self.__drop(jobs.get_nowait())
+                        jobs.task_done()
+                    except queue.Empty:
+                        pass
+
+        depth = self.queue_depth()
+        with self.lock:
+            self.max_depth = max(self.max_depth, depth)
+
+        logging.debug(f"Queued export to {exporter.name} for slot {reader.slot}, queue depth: {depth}")
+
+    def queue_depth(self) -> int:
+        return sum(jobs.qsize() for jobs in self.queues)
+
+    def __drop(self, job : ExportJob):
+        with self.lock:
+            self.dropped += 1
+
+        logging.warning(f"Export queue full, dropped export to {job.exporter.name} for slot {job.reader.slot} (dropped: {self.dropped})")
+
+    def __worker(self, jobs : queue.Queue[ExportJob]):
+        while True:
+            job = jobs.get()
+            self.__run(job)
+            jobs.task_done()
+
+    def __deliverer(self):
+        assert self.outbox is not None
+
+        while True:
+            for entry in self.outbox.take_due():
+                exporter = self.exporters.get(entry.exporter_name, None)
+                reader = self.readers.get(entry.reader_name, None)
+
+                if exporter is None or reader is None:
+                    # Configuration changed since the export was stored, there is nobody to deliver it to
+                    logging.warning(f"Discarding stored export to {entry.exporter_name} for reader {entry.reader_name}, not configured anymore")
+                    self.outbox.ack(entry.seq)
+                    continue
+
+                logging.info(f"Replaying export to {exporter.name} for slot {entry.slot} (attempt {entry.attempts + 1})")
+                self.__enqueue(ExportJob(exporter, entry.scan, entry.filament, reader, entry.seq))
+
+            due_in = self.outbox.next_due_in()
+            self.outbox_changed.wait(due_in if due_in is not None else self.outbox.retry_max_seconds)
+            self.outbox_changed.clear()
+
+    def __run(self, job : ExportJob):
+        # A newer export for the same target and slot was queued after this one, only the latest state matters
+        if self.outbox is not None and job.seq is not None and not self.outbox.is_latest(job.seq):
+            return
+
+        try:
+            delivered = job.exporter.export_data(job.scan, job.filament, job.reader)
+        except Exception as e:
+            job.exporter.logger.exception(f"Export failed: {e}")
+            delivered = False
+
+        with self.lock:
+            if delivered:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+        if self.outbox is None or job.seq is None:
+            return
+
+        if delivered:
+            self.outbox.ack(job.seq)
+        else:
+            self.outbox.retry_later(job.seq)
+            self.outbox_changed.set()
@@ -23,7 +23,11 @@ class Exporter(ConfigurableEntity):
         if not self.events:
             self.logger.error(f"Exporter '{self.name}' must have at least one event specified in the configuration")
 
+    def target(self) -> str:
+        """Identifies where exports end up. Exporters with the same target overwrite each other's state, so only the latest export per target and slot is delivered."""
+        return self.name
+
     @abstractmethod
-    def export_data(self, scan: ScanResult|None, filament: GenericFilament|None, reader : RfidReader):
-        """Exports the given filament data associated with a scan result. The scan and filament may be None if the export is triggered by a read error or unrecognized tag."""
+    def export_data(self, scan: ScanResult|None, filament: GenericFilament|None, reader : RfidReader) -> bool:
+        """Exports the given filament data associated with a scan result. The scan and filament may be None if the export is triggered by a read error or unrecognized tag. Returns False if the export failed and should be retried."""
         raise NotImplementedError("Subclasses must implement this method")
\ No newline at end of file
@@ -0,0 +1,147 @@
+from filament.generic import GenericFilament
+from reader.scan_result import ScanResult
+import json
+import sqlite3
+import threading
+import time
+
+class OutboxEntry:
+    def __init__(self, exporter_name : str, target : str, slot : int, seq : int, reader_name : str, scan : ScanResult|None, filament : GenericFilament|None, attempts : int):
+        self.exporter_name = exporter_name
+        self.target = target
+        self.slot = slot
+        self.seq = seq
+        self.reader_name = reader_name
+        self.scan = scan
+        self.filament = filament
+        self.attempts = attempts
+
+class ExportOutbox:
+    """Keeps exports on disk until they are delivered, so they survive failed exporters and restarts.
+
+    Only the latest export per target and slot is kept, since that is the state the receiver needs to end up in.
+    This holds across exporters, a failed export is never replayed over a newer one another exporter sent to the same place."""
+
+    def __init__(self, path : str, retry_min_seconds : float, retry_max_seconds : float):
+        self.retry_min_seconds = retry_min_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(outbox)").fetchall()]
+        if len(columns) > 0 and "target" not in columns:
+            # Written before exports were keyed by target, their target was the exporter itself
+            self.connection.execute("ALTER TABLE outbox RENAME TO outbox_old")
+
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                exporter TEXT NOT NULL,
+                target TEXT NOT NULL,
+                slot INTEGER NOT NULL,
+                seq INTEGER NOT NULL UNIQUE,
+                reader TEXT NOT NULL,
+                scan TEXT,
+                filament TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (target, slot)
+            )
+        """)
+
+        if len(columns) > 0 and "target" not in columns:
+            self.connection.execute("""
+                INSERT OR REPLACE INTO outbox (exporter, target, slot, seq, reader, scan, filament, attempts, next_attempt)
+                SELECT exporter, exporter, slot, seq, reader, scan, filament, attempts, next_attempt FROM outbox_old ORDER BY seq
+            """)
+            self.connection.execute("DROP TABLE outbox_old")
+
+        # Whatever was left over from the last run is due right away
+        self.connection.execute("UPDATE outbox SET next_attempt = 0")
+
+        row = self.connection.execute("SELECT MAX(seq) FROM outbox").fetchone()
+        self.next_seq = (row[0] or 0) + 1
+
+    def store(self, exporter_name : str, target : str, slot : int, reader_name : str, scan : ScanResult|None, filament : GenericFilament|None) -> int:
+        """Write an export before it is attempted, replacing any older export for the same target and slot, whichever exporter it came from. Returns its sequence number."""
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+
+            self.connection.execute(
+                "INSERT OR REPLACE INTO outbox (exporter, target, slot, seq, reader, scan, filament, attempts, next_attempt) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)",
+                (
+                    exporter_name,
+                    target,
+                    slot,
+                    seq,
+                    reader_name,
+                    json.dumps(scan.to_dict()) if scan else None,
+                    json.dumps(filament.to_dict()) if filament else None,
+                    # Not due for replay until the first attempt had a chance to fail
+                    time.time() + self.retry_min_seconds
+                )
+            )
+
+            return seq
+
+    def is_latest(self, seq : int) -> bool:
+        """An export that was replaced by a newer one for the same target and slot is gone from the outbox."""
+        with self.lock:
+            row = self.connection.execute("SELECT 1 FROM outbox WHERE seq = ?", (seq,)).fetchone()
+            return row is not None
+
+    def ack(self, seq : int):
+        # A newer export that replaced this one in the meantime stays
+        with self.lock:
+            self.connection.execute("DELETE FROM outbox WHERE seq = ?", (seq,))
+
+    def retry_later(self, seq : int):
+        with self.lock:
+            row = self.connection.execute("SELECT attempts FROM outbox WHERE seq = ?", (seq,)).fetchone()
+            if row is None:
+                return
+
+            attempts = row[0] + 1
+            delay = min(self.retry_max_seconds, self.retry_min_seconds * (2 ** (attempts - 1)))
+
+            self.connection.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt = ? WHERE seq = ?",
+                (attempts, time.time() + delay, seq)
+            )
+
+    def take_due(self) -> list[OutboxEntry]:
+        """Return the exports whose retry is due. They are not returned again until retry_later() reschedules them or they time out."""
+        now = time.time()
+
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT exporter, target, slot, seq, reader, scan, filament, attempts FROM outbox WHERE next_attempt <= ? ORDER BY seq",
+                (now,)
+            ).fetchall()
+
+            # Park them while they are in flight, a lost attempt is picked up again after the longest backoff
+            self.connection.execute("UPDATE outbox SET next_attempt = ? WHERE next_attempt <= ?", (now + self.retry_max_seconds, now))
+
+        return [
+            OutboxEntry(
+                exporter,
+                target,
+                slot,
+                seq,
+                reader,
+                ScanResult.from_dict(json.loads(scan)) if scan else None,
+                GenericFilament.from_dict(json.loads(filament)) if filament else None,
+                attempts
+            )
+            for (exporter, target, slot, seq, reader, scan, filament, attempts) in rows
+        ]
+
+    def next_due_in(self) -> float | None:
+        """Seconds until the next export is due, or None if the outbox is empty."""
+        with self.lock:
+            row = self.connection.execute("SELECT MIN(next_attempt) FROM outbox").fetchone()
+
+        if row[0] is None:
+            return None
+
+        return max(0, row[0] - time.time())
@@ -1,9 +1,14 @@
 import requests
 import jinja2
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from exporters.exporter import Exporter
 from filament.generic import GenericFilament
 from reader.scan_result import ScanResult
+from collections import OrderedDict
 import json
+import re
+import threading
 from reader.rfid_reader import RfidReader
 
 class WebhookExporter(Exporter):
@@ -12,44 +17,49 @@ class WebhookExporter(Exporter):
         self.env = jinja2.Environment()
         self.url = config.get("url", None)
         url_template = config.get("url_template", None)
+        self.url_template_source = url_template
         self.url_template = self.env.from_string(url_template) if url_template else None
         self.method = str(config.get("method", "POST")).upper()
         self.headers = config.get("headers", {})
         self.body_json = config.get("body_json", None)
         body_json_template = config.get("body_json_template", None)
         self.body_json_template = self.env.from_string(body_json_template) if body_json_template else None
+        # Like body_json, but string values are templates and a value that is only "{{ expression }}" keeps its type
+        body_json_builder = config.get("body_json_builder", None)
+        if isinstance(body_json_builder, str):
+            body_json_builder = json.loads(body_json_builder)
+        self.body_json_builder = self.__compile_json_builder(body_json_builder) if body_json_builder is not None else None
+        self.render_cache_size = int(config.get("render_cache_size", 16))
+        self.render_cache : OrderedDict[str, tuple[str, object]] = OrderedDict()
+        self.render_lock = threading.Lock()
         self.timeout = float(config.get("timeout", 5.0))
+        self.pool_size = int(config.get("pool_size", 4))
+        self.retries = int(config.get("retries", 2))
+        self.retry_backoff_factor = float(config.get("retry_backoff_factor", 0.2))
+
+        # Keep connections alive between events instead of opening a new one for every export
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.retry_backoff_factor,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=None
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
         if not self.url and not self.url_template:
             raise ValueError("WebhookExporter requires either a 'url' or 'url_template' in the configuration")
 
-    def export_data(self, scan: ScanResult|None, filament: GenericFilament|None, reader : RfidReader):
-        context = {
-            "scan": scan.to_dict() if scan else None,
-            "filament": filament.to_dict() if filament else None,
-            "reader": {
-                "name": reader.name,
-                "slot": reader.slot
-            }
-        }
+    def target(self) -> str:
+        return f"{self.method} {self.url or self.url_template_source}"
 
+    def export_data(self, scan: ScanResult|None, filament: GenericFilament|None, reader : RfidReader) -> bool:
         try:
-            if self.url_template:
-                url = str(self.url_template.render(context))
-            elif self.url:
-                url = self.url
-            else:
-                raise ValueError("No URL or URL template provided for webhook export")
-
-            if self.body_json:
-                json_data = self.body_json
-            elif self.body_json_template:
-                body_str = self.body_json_template.render(context)
-                json_data = json.loads(body_str)
-            else:
-                json_data = None
-
-            response = requests.request(
+            url, json_data = self.__render(scan, filament, reader)
+
+            response = self.session.request(
                 method=self.method,
                 url=url,
                 json=json_data,
@@ -58,5 +68,90 @@ class WebhookExporter(Exporter):
             )
 
             response.raise_for_status()
+            return True
         except Exception as e:
-            self.logger.exception(f"Failed to export data via webhook: {e}")
\ No newline at end of file
+            self.logger.exception(f"Failed to export data via webhook: {e}")
+            return False
+
+    def __render(self, scan: ScanResult|None, filament: GenericFilament|None, reader : RfidReader) -> tuple[str, object]:
+        context = {
+            "scan": scan.to_dict() if scan else None,
+            "filament": filament.to_dict() if filament else None,
+            "reader": {
+                "name": reader.name,
+                "slot": reader.slot
+            }
+        }
+
+        # The rendered request only depends on the context, and the same spool is exported over and over.
+        # Keyed on everything the templates can see, unique_id alone leaves out fields like the temperatures
+        key = json.dumps(context, sort_keys=True, default=str)
+
+        with self.render_lock:
+            cached = self.render_cache.get(key, None)
+            if cached is not None:
+                self.render_cache.move_to_end(key)
+                return cached
+
+        if self.url_template:
+            url = str(self.url_template.render(context))
+        elif self.url:
+            url = self.url
+        else:
+            raise ValueError("No URL or URL template provided for webhook export")
+
+        if self.body_json:
+            json_data = self.body_json
+        elif self.body_json_builder is not None:
+            json_data = self.__build_json(self.body_json_builder, context)
+        elif self.body_json_template:
+            body_str = self.body_json_template.render(context)
+            json_data = json.loads(body_str)
+        else:
+            json_data = None
+
+        if self.render_cache_size > 0:
+            with self.render_lock:
+                self.render_cache[key] = (url, json_data)
+
+                while len(self.render_cache) > self.render_cache_size:
+                    self.render_cache.popitem(last=False)
+
+        return (url, json_data)
+
+    def __compile_json_builder(self, node):
+        if isinstance(node, dict):
+            return {key: self.__compile_json_builder(value) for key, value in node.items()}
+
+        if isinstance(node, list):
+            return [self.__compile_json_builder(value) for value in node]
+
+        if isinstance(node, str):
+            # A value that is a single {{ expression }} keeps the type the expression evaluates to
+            match = re.fullmatch(r"\s*\{\{(.*)\}\}\s*", node, re.DOTALL)
+            if match and "{{" not in match.group(1):
+                return CompiledExpression(self.env.compile_expression(match.group(1)))
+
+            if "{{" in node or "{%" in node:
+                return self.env.from_string(node)
+
+        return node
+
+    def __build_json(self, node, context : dict):
+        if isinstance(node, dict):
+            return {key: self.__build_json(value, context) for key, value in node.items()}
+
+        if isinstance(node, list):
+            return [self.__build_json(value, context) for value in node]
+
+        if isinstance(node, CompiledExpression):
+            return node.expression(**context)
+
+        if isinstance(node, jinja2.Template):
+            return node.render(context)
+
+        return node
+
+class CompiledExpression:
+    def __init__(self, expression):
+        self.expression = expression
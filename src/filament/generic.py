@@ -75,6 +75,9 @@ class GenericFilament:
         return to_rgba(argb)
     
     def to_dict(self) -> dict:
+        rgba = self.rgba
+        colors_rgba = [to_rgba(color) for color in self.colors]
+
         return {
             "source_processor": self.source_processor,
             "unique_id": self.unique_id,
@@ -82,11 +85,11 @@ class GenericFilament:
             "type": self.type,
             "modifiers": self.modifiers,
             "colors": self.colors,
-            "rgba": self.rgba,
-            "rgb": (self.rgba >> 8) & 0xFFFFFF,
-            "alpha": self.rgba & 0xFF,
-            "colors_rgba": [to_rgba(color) for color in self.colors],
-            "colors_rgba_hex": [f"{to_rgba(color):08X}" for color in self.colors],
+            "rgba": rgba,
+            "rgb": (rgba >> 8) & 0xFFFFFF,
+            "alpha": rgba & 0xFF,
+            "colors_rgba": colors_rgba,
+            "colors_rgba_hex": [f"{color:08X}" for color in colors_rgba],
             "diameter_mm": self.diameter_mm,
             "weight_grams": self.weight_grams,
             "hotend_min_temp_c": self.hotend_min_temp_c,
@@ -97,6 +100,25 @@ class GenericFilament:
             "manufacturing_date": self.manufacturing_date
         }
     
+    @staticmethod
+    def from_dict(data: dict) -> "GenericFilament":
+        return GenericFilament(
+            source_processor=data["source_processor"],
+            unique_id=data["unique_id"],
+            manufacturer=data["manufacturer"],
+            type=data["type"],
+            modifiers=list(data["modifiers"]),
+            colors=list(data["colors"]),
+            diameter_mm=data["diameter_mm"],
+            weight_grams=data["weight_grams"],
+            hotend_min_temp_c=data["hotend_min_temp_c"],
+            hotend_max_temp_c=data["hotend_max_temp_c"],
+            bed_temp_c=data["bed_temp_c"],
+            drying_temp_c=data["drying_temp_c"],
+            drying_time_hours=data["drying_time_hours"],
+            manufacturing_date=data["manufacturing_date"]
+        )
+
     @staticmethod
     def generate_unique_id(*args) -> str:
         strings = "|".join([str(arg) for arg in args])
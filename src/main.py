@@ -1,6 +1,6 @@
 
 from typing import cast
-from bus import OutputPin, SoftwareSPI
+from bus import OutputPin, InputPin, SoftwareSPI
 from config import register_configurable_entity, get_required_configurable_entity_by_name, TYPE_RUNTIME, TYPE_EXPORTER, TYPE_TAG_PROCESSOR, TYPE_RFID_READER, ConfigurableEntity
 from config.configuration import Configuration
 from controllers.moonraker_remote_method import MoonrakerRemoteMethodController
@@ -43,6 +43,8 @@ def create_configurable_entity(key: str, config: dict) -> ConfigurableEntity:
             return Configuration(config)
         case "output_pin":
             return OutputPin(config)
+        case "input_pin":
+            return InputPin(config)
         case "software_spi":
             return SoftwareSPI(config)
         case "fm175xx":
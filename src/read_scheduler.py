@@ -0,0 +1,39 @@
+import threading
+import time
+
+class ReadScheduler:
+    """Keeps a deadline per reader slot and wakes the workers waiting on those slots as soon as one is due."""
+
+    def __init__(self, slot_count : int):
+        self.condition = threading.Condition()
+        self.deadlines : list[float|None] = [None] * slot_count
+
+    def schedule(self, slot : int, delay_seconds : float = 0):
+        """Make the slot due after the given delay. An earlier deadline that is already set is kept."""
+        deadline = time.monotonic() + delay_seconds
+
+        with self.condition:
+            current = self.deadlines[slot]
+            if current is None or deadline < current:
+                self.deadlines[slot] = deadline
+                self.condition.notify_all()
+
+    def wait_for_due(self, slots : list[int]) -> int:
+        """Block until one of the given slots is due, then clear its deadline and return it."""
+        with self.condition:
+            while True:
+                pending : dict[int, float] = {slot: deadline for slot in slots if (deadline := self.deadlines[slot]) is not None}
+
+                if len(pending) == 0:
+                    # Nothing scheduled, sleep until schedule() notifies
+                    self.condition.wait()
+                    continue
+
+                slot = min(pending, key=lambda slot: pending[slot])
+                remaining = pending[slot] - time.monotonic()
+
+                if remaining <= 0:
+                    self.deadlines[slot] = None
+                    return slot
+
+                self.condition.wait(remaining)
@@ -80,6 +80,17 @@ FM175XX_TEST_DAC_1_REG                  = 0x39
 FM175XX_TEST_DAC_2_REG                  = 0x3A
 FM175XX_TEST_ADC_REG                    = 0x3B
 
+# Configuration registers the chip never changes by itself, so the last value written to them can be trusted
+FM175XX_SHADOWED_REGS                   = frozenset([
+    FM175XX_TX_MODE_REG,
+    FM175XX_RX_MODE_REG,
+    FM175XX_TX_CONTROL_REG,
+    FM175XX_T_MODE_REG,
+    FM175XX_T_PRESCALER_REG,
+    FM175XX_T_RELOAD_MSB_REG,
+    FM175XX_T_RELOAD_LSB_REG,
+])
+
 # FM175xx command code
 FM175XX_CMD_IDLE                        = 0x00
 FM175XX_CMD_GEN_RANDOM_ID               = 0x02
@@ -97,6 +108,9 @@ FM175XX_RF_CMD_WUPA                     = 0x52
 FM175XX_RF_CMD_ANTICOL                  = [0x93, 0x95, 0x97]
 FM175XX_RF_CMD_SELECT                   = [0x93, 0x95, 0x97]
 FM175XX_RF_CMD_HALT                     = [0x50, 0x00]
+FM175XX_RF_CMD_READ                     = 0x30
+FM175XX_RF_CMD_GET_VERSION              = 0x60
+FM175XX_RF_CMD_FAST_READ                = 0x3A
 
 # Chip Type
 FM175XX_CHIP_TYPE_UNKNOWN               = 0x00
@@ -124,6 +138,25 @@ FM175XX_ULTRALIGHT_TOTAL_PAGES          = 44
 
 FM175XX_ULTRALIGHT_VALID_END_PAGES      = [FM175XX_NTAG215_TOTAL_PAGES, FM175XX_ULTRALIGHT_TOTAL_PAGES]
 
+# GET_VERSION response
+FM175XX_ULTRALIGHT_VERSION_LEN          = 8
+FM175XX_ULTRALIGHT_VERSION_VENDOR_NXP   = 0x04
+FM175XX_ULTRALIGHT_VERSION_TYPE_UL      = 0x03
+FM175XX_ULTRALIGHT_VERSION_TYPE_NTAG    = 0x04
+# (vendor, product type, storage size) of the GET_VERSION response -> total pages
+FM175XX_ULTRALIGHT_VERSION_TO_PAGES = {
+    (FM175XX_ULTRALIGHT_VERSION_VENDOR_NXP, FM175XX_ULTRALIGHT_VERSION_TYPE_UL, 0x0B): 20,      # Ultralight EV1 MF0UL11
+    (FM175XX_ULTRALIGHT_VERSION_VENDOR_NXP, FM175XX_ULTRALIGHT_VERSION_TYPE_UL, 0x0E): 41,      # Ultralight EV1 MF0UL21
+    (FM175XX_ULTRALIGHT_VERSION_VENDOR_NXP, FM175XX_ULTRALIGHT_VERSION_TYPE_NTAG, 0x0B): 20,    # NTAG210
+    (FM175XX_ULTRALIGHT_VERSION_VENDOR_NXP, FM175XX_ULTRALIGHT_VERSION_TYPE_NTAG, 0x0E): 41,    # NTAG212
+    (FM175XX_ULTRALIGHT_VERSION_VENDOR_NXP, FM175XX_ULTRALIGHT_VERSION_TYPE_NTAG, 0x0F): 45,    # NTAG213
+    (FM175XX_ULTRALIGHT_VERSION_VENDOR_NXP, FM175XX_ULTRALIGHT_VERSION_TYPE_NTAG, 0x11): 135,   # NTAG215
+    (FM175XX_ULTRALIGHT_VERSION_VENDOR_NXP, FM175XX_ULTRALIGHT_VERSION_TYPE_NTAG, 0x13): 231,   # NTAG216
+}
+# FAST_READ responses are sized to fit the 64 byte FIFO (the CRC is stripped by the chip)
+FM175XX_FIFO_SIZE                       = 64
+FM175XX_FAST_READ_MAX_PAGES             = FM175XX_FIFO_SIZE // FM175XX_NTAG215_BYTES_PER_PAGE
+
 # About M1 Card
 # EEPROM
 FM175XX_M1_CARD_EEPROM_SIZE             = 1024
@@ -1,12 +1,13 @@
-from tag.mifare_classic_tag_processor import TagAuthentication
+from tag.mifare_classic_tag_processor import TagAuthentication, MifareClassicReadPlan
 from tag.tag_types import tag_type_from_sak
 from . import constants as Constants
-from bus import SoftwareSPI, OutputPin
+from bus import SoftwareSPI, SpiTransaction, OutputPin, InputPin
 from reader.mifare_classic_reader import MifareClassicReader
 from reader.mifare_ultralight_reader import MifareUltralightReader
 from reader.scan_result import ScanResult
-from config import get_required_configurable_entity_by_name, TYPE_SOFTWARE_SPI, TYPE_OUTPUT_PIN
-from typing import cast
+from reader.read_error import ReadError
+from config import get_required_configurable_entity_by_name, TYPE_SOFTWARE_SPI, TYPE_OUTPUT_PIN, TYPE_INPUT_PIN
+from typing import cast, Callable
 import time
 
 # Reader command
@@ -38,15 +39,31 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
         super().__init__(config)
         self.spi = cast(SoftwareSPI, get_required_configurable_entity_by_name(config["spi"], TYPE_SOFTWARE_SPI))
         self.reset_pin = cast(OutputPin, get_required_configurable_entity_by_name(config["reset_pin"], TYPE_OUTPUT_PIN))
+        irq_pin = config.get("irq_pin", None)
+        self.irq_pin = cast(InputPin, get_required_configurable_entity_by_name(irq_pin, TYPE_INPUT_PIN)) if irq_pin else None
+        # Without an IRQ pin, COM_IRQ_REG is polled with an interval that backs off while the tag is busy
+        self.poll_interval_seconds = float(config.get("poll_interval_seconds", 0.0002))
+        self.poll_interval_max_seconds = float(config.get("poll_interval_max_seconds", 0.002))
+        self.poll_backoff_factor = float(config.get("poll_backoff_factor", 2.0))
+        self.shadow_regs : dict[int, int] = {}
+        self.spi_transfers_saved = 0
+        self.timer_settings : dict[int, list[tuple[int, int]]] = {}
+        self.programmed_timeout : int|None = None
+        self.tag_selected = False
         self.hard_reset()
 
     def hard_reset(self):
+        # Registers go back to their power-on values
+        self.shadow_regs.clear()
+        self.programmed_timeout = None
         self.reset_pin.set_low()
         time.sleep(0.3)
         self.reset_pin.set_high()
         time.sleep(0.3)
 
     def start_session(self):
+        self.read_error = ReadError.NONE
+        self.tag_selected = False
         self.__reader_a_init()
         self.__set_carrier_wave(Constants.FM175XX_CW_ENABLE)
 
@@ -55,44 +72,125 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
         self.__set_carrier_wave(Constants.FM175XX_CW_DISABLE)
 
     def scan(self) -> ScanResult | None:
+        # A tag selected earlier in this session ignores WUPA, halt it and leave its crypto1 state behind first
+        if (self.tag_selected):
+            self.__reader_a_halt()
+            self.__register_modify(Constants.FM175XX_STATUS_2_REG, 0x08, Constants.FM175XX_RESET)
+
         (ret, UID, ATQA, BCC, SAK) = self.__reader_a_activate()
+        self.tag_selected = ret == Constants.FM175XX_OK
         if (ret != Constants.FM175XX_OK):
             self.logger.error("Scan error: %d", ret)
+            self.read_error = self.__classify_error(ret)
             return None
 
+        self.read_error = ReadError.NONE
         return ScanResult(tag_type_from_sak(bytes(SAK)), bytes(UID), bytes(ATQA), bytes(BCC), bytes(SAK))
 
-    def read_mifare_classic(self, scan_result: ScanResult, keys: TagAuthentication) -> bytes | None:
-        data = self.__reader_a_m1_read_all_data(list(scan_result.uid), Constants.FM175XX_M1_CARD_AUTH_MODE_A, keys)
+    def is_tag_present(self) -> bool:
+        # WUPA alone, without anticollision and select. Anything but silence means a tag answered
+        (ret, _) = self.__reader_a_wakeup()
+        present = ret != Constants.FM175XX_CARD_TIMER_ERR
+
+        # The tag is now ready and would ignore the WUPA of a following scan, so that one has to halt it first
+        self.tag_selected = present
+        return present
+
+    def read_mifare_classic(self, scan_result: ScanResult, keys: TagAuthentication, read_plan: MifareClassicReadPlan | None = None) -> bytes | None:
+        data = self.__reader_a_m1_read_all_data(list(scan_result.uid), Constants.FM175XX_M1_CARD_AUTH_MODE_A, keys, read_plan)
 
         if data.err_code != Constants.FM175XX_OK:
             self.logger.error("Mifare Classic read error: %d", data.err_code)
+            self.read_error = self.__classify_error(data.err_code)
             return None
 
         return bytes(data.out_data)
     
-    def read_mifare_ultralight(self, scan_result: ScanResult) -> bytes | None:
-        data = self.__reader_a_ultralight_read_all_data()
+    def probe_mifare_classic(self, scan_result: ScanResult, candidates: list[TagAuthentication]) -> int | None:
+        uid = list(scan_result.uid)
+        failed_before = False
+
+        for i, keys in enumerate(candidates):
+            # A wrong key is rejected every time, a glitch of the RF link rarely twice in a row
+            for _ in range(2):
+                # A failed authentication drops the tag back to idle, so wake it up again without restarting the session
+                if failed_before:
+                    ret = self.__reader_a_reactivate()
+                    if ret != Constants.FM175XX_OK:
+                        self.logger.error("Tag lost while probing keys")
+                        self.read_error = self.__classify_error(ret)
+                        return None
+
+                if self.__reader_a_mifare_auth(Constants.FM175XX_M1_CARD_AUTH_MODE_A, 0, keys.hkdf_key_a[0], uid) == Constants.FM175XX_OK:
+                    return i
+
+                failed_before = True
+
+        # The keys were only rejected if the tag still answers, otherwise the link failed and the read is worth retrying
+        ret = self.__reader_a_reactivate()
+        if ret != Constants.FM175XX_OK:
+            self.logger.error("Tag lost while probing keys")
+            self.read_error = self.__classify_error(ret)
+            return None
+
+        self.read_error = ReadError.FATAL
+        return None
+
+    def read_mifare_ultralight(self, scan_result: ScanResult, is_complete: Callable[[bytes], bool] | None = None) -> bytes | None:
+        data = self.__reader_a_ultralight_read_all_data(is_complete)
 
         if data.err_code != Constants.FM175XX_OK:
             self.logger.error("Mifare Classic read error: %d", data.err_code)
+            self.read_error = self.__classify_error(data.err_code)
             return None
 
         return bytes(data.out_data)
 
+    def __classify_error(self, err_code:int) -> ReadError:
+        match err_code:
+            case Constants.FM175XX_OK:
+                return ReadError.NONE
+            case Constants.FM175XX_CARD_WAKEUP_ERR:
+                return ReadError.NO_TAG
+            case Constants.FM175XX_CARD_AUTH_ERR | Constants.FM175XX_PARAM_ERR | Constants.FM175XX_CHIP_TYPE_ERR:
+                return ReadError.FATAL
+            case _:
+                return ReadError.TRANSIENT
+
     # read register
     def __register_read(self, addr:int) -> int:
-        addr = (addr << 1) | 0x80
-        to_send = [addr, 0x00]
+        if addr in self.shadow_regs:
+            self.spi_transfers_saved += 1
+            return self.shadow_regs[addr]
+
+        to_send = [(addr << 1) | 0x80, 0x00]
         reg_data = self.spi.transfer(to_send)
+
+        if addr in Constants.FM175XX_SHADOWED_REGS:
+            self.shadow_regs[addr] = reg_data[1]
+
         return reg_data[1]
     
     # write register
     def __register_write(self, addr:int, reg_data:int) -> None:
-        addr = (addr << 1) & 0x7E
-        to_send = [addr, reg_data]
+        if self.__shadow_write(addr, reg_data):
+            return
+
+        to_send = [(addr << 1) & 0x7E, reg_data]
         self.spi.transfer(to_send)
 
+    # update the shadow of a register, returns True if the chip already holds this value
+    def __shadow_write(self, addr:int, reg_data:int) -> bool:
+        if addr not in Constants.FM175XX_SHADOWED_REGS:
+            return False
+
+        if self.shadow_regs.get(addr, None) == reg_data:
+            self.spi_transfers_saved += 1
+            return True
+
+        self.shadow_regs[addr] = reg_data
+        return False
+
     # modify register
     def __register_modify(self, addr:int, mask:int, is_set:int) -> None:
         reg_data = self.__register_read(addr)
@@ -100,8 +198,24 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
             reg_data |= mask
         else:
             reg_data &= ~mask
+        # Writes of shadowed registers that are already in the requested state are skipped
         self.__register_write(addr, reg_data)
 
+    # queue a register read, returns the frame index holding the result
+    def __queue_register_read(self, txn:SpiTransaction, addr:int) -> int:
+        return txn.add([(addr << 1) | 0x80, 0x00])
+
+    # queue a register write
+    def __queue_register_write(self, txn:SpiTransaction, addr:int, reg_data:int) -> None:
+        if self.__shadow_write(addr, reg_data):
+            return
+
+        txn.add([(addr << 1) & 0x7E, reg_data])
+
+    # queue a FIFO write
+    def __queue_fifo_write(self, txn:SpiTransaction, len:int, buff:list) -> None:
+        txn.add([0x12] + buff[0:len])
+
     # read FIFO
     def __fifo_read(self, len:int) -> list[int]:
         addr = [0x92] * len + [0x00]
@@ -114,28 +228,36 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
         to_write += buff[0:len]
         self.spi.transfer(to_write)
 
-    # Enable/Disable CRC check generation during data transmission.
-    def __set_send_crc(self, mode:int) -> None:
-        if (mode):
-            self.__register_modify(Constants.FM175XX_TX_MODE_REG, 0x80, Constants.FM175XX_SET)
-        else:
-            self.__register_modify(Constants.FM175XX_TX_MODE_REG, 0x80, Constants.FM175XX_RESET)
-
-    # Enable/Disable CRC check generation during data reception.
-    def __set_recv_crc(self, mode:int) -> None:
-        if (mode):
-            self.__register_modify(Constants.FM175XX_RX_MODE_REG, 0x80, Constants.FM175XX_SET)
-        else:
-            self.__register_modify(Constants.FM175XX_RX_MODE_REG, 0x80, Constants.FM175XX_RESET)
-
     # Set the timeout period for communication
     def __set_timeout(self, microseconds:int) -> None:
-        prescaler = 0
-        time_reload = 0
+        txn = self.spi.transaction()
+        self.__queue_timeout(txn, microseconds)
+        txn.execute()
 
+    # Queue the timer register writes for a timeout period
+    def __queue_timeout(self, txn:SpiTransaction, microseconds:int) -> None:
         if microseconds < 1 :
             microseconds = 1
 
+        # Nearly every command uses the same timeout, so the timer usually is already programmed
+        if (self.programmed_timeout == microseconds):
+            return
+
+        timer_regs = self.timer_settings.get(microseconds, None)
+        if (timer_regs is None):
+            timer_regs = self.__compute_timer_settings(microseconds)
+            self.timer_settings[microseconds] = timer_regs
+
+        for (addr, reg_data) in timer_regs:
+            self.__queue_register_write(txn, addr, reg_data)
+
+        self.programmed_timeout = microseconds
+
+    # Compute the timer register values for a timeout period
+    def __compute_timer_settings(self, microseconds:int) -> list[tuple[int, int]]:
+        prescaler = 0
+        time_reload = 0
+
         while( prescaler < 0xFFF ):
             time_reload = int((( microseconds * 13560 ) -1 ) / ( prescaler * 2 + 1))
             if (time_reload < 0xFFFF):
@@ -143,10 +265,12 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
             prescaler += 1
 
         time_reload &=  0xFFFF
-        self.__register_write(Constants.FM175XX_T_MODE_REG, 0x80 | ((prescaler >> 8) & 0x0F) )
-        self.__register_write(Constants.FM175XX_T_PRESCALER_REG, prescaler & 0xFF)
-        self.__register_write(Constants.FM175XX_T_RELOAD_MSB_REG, time_reload >> 8 )
-        self.__register_write(Constants.FM175XX_T_RELOAD_LSB_REG, time_reload & 0xFF )
+        return [
+            (Constants.FM175XX_T_MODE_REG, 0x80 | ((prescaler >> 8) & 0x0F)),
+            (Constants.FM175XX_T_PRESCALER_REG, prescaler & 0xFF),
+            (Constants.FM175XX_T_RELOAD_MSB_REG, time_reload >> 8),
+            (Constants.FM175XX_T_RELOAD_LSB_REG, time_reload & 0xFF),
+        ]
 
     # set carrier wave
     def __set_carrier_wave(self, mode:int) -> None:
@@ -162,6 +286,30 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
             self.__register_modify(Constants.FM175XX_TX_CONTROL_REG, 0x03, Constants.FM175XX_RESET)
 
 
+    # Interrupt sources __command_exe acts on in the current state of the command
+    def __command_irq_mask(self, cmd:Fm175xxCmdMetaData, send_length:int) -> int:
+        irq_mask = 0x01 | 0x02 | 0x08 | 0x40
+        if (send_length > 0):
+            irq_mask |= 0x04
+        if (cmd.cmd == Constants.FM175XX_CMD_MF_AUTHENT):
+            irq_mask |= 0x10
+        if (cmd.cmd == Constants.FM175XX_CMD_TRANSCEIVE):
+            irq_mask |= 0x20
+        return irq_mask
+
+    # Wait for the chip to raise an interrupt, returns the poll interval to use next
+    def __wait_for_irq(self, deadline:float, poll_interval:float) -> float:
+        remaining = deadline - time.monotonic()
+        if (remaining <= 0):
+            return poll_interval
+
+        if (self.irq_pin is not None):
+            self.irq_pin.wait_for_edge(remaining)
+            return poll_interval
+
+        time.sleep(min(poll_interval, remaining))
+        return min(poll_interval * self.poll_backoff_factor, self.poll_interval_max_seconds)
+
     # Execute Command
     def __command_exe(self, cmd:Fm175xxCmdMetaData) -> Fm175xxReturnVal:
         reg_data = 0
@@ -175,40 +323,60 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
         cmd.coll_pos = 0
         cmd.error = 0
         fifo_water_level  = 32
-        last_time = time.time()
-
-        self.__register_write(Constants.FM175XX_COMMAND_REG, Constants.FM175XX_CMD_IDLE)
-        self.__register_write(Constants.FM175XX_FIFO_LEVEL_REG, 0x80)
-        self.__register_write(Constants.FM175XX_COM_IRQ_REG, 0x7F)
-        self.__register_write(Constants.FM175XX_DIV_IRQ_REG, 0x7F)
-        self.__register_write(Constants.FM175XX_COM_I_EN_REG, 0x80)
-        self.__register_write(Constants.FM175XX_DIV_I_EN_REG, 0x00)
-        self.__register_write(Constants.FM175XX_WATER_LEVEL_REG, fifo_water_level)
+        irq_mask = self.__command_irq_mask(cmd, send_length)
+        poll_interval = self.poll_interval_seconds
+
+        # The CRC bits are read-modify-write, the mode registers are shadowed so this normally needs no SPI traffic
+        tx_mode = self.__register_read(Constants.FM175XX_TX_MODE_REG)
+        rx_mode = self.__register_read(Constants.FM175XX_RX_MODE_REG)
+
+        # Send the whole command setup as a single burst
+        txn = self.spi.transaction()
+        self.__queue_register_write(txn, Constants.FM175XX_COMMAND_REG, Constants.FM175XX_CMD_IDLE)
+        self.__queue_register_write(txn, Constants.FM175XX_FIFO_LEVEL_REG, 0x80)
+        self.__queue_register_write(txn, Constants.FM175XX_COM_IRQ_REG, 0x7F)
+        self.__queue_register_write(txn, Constants.FM175XX_DIV_IRQ_REG, 0x7F)
+        if (self.irq_pin is not None):
+            # Active low push-pull IRQ output, raised for exactly the sources handled below
+            self.irq_pin.clear_events()
+            self.__queue_register_write(txn, Constants.FM175XX_COM_I_EN_REG, 0x80 | irq_mask)
+            self.__queue_register_write(txn, Constants.FM175XX_DIV_I_EN_REG, 0x80)
+        else:
+            self.__queue_register_write(txn, Constants.FM175XX_COM_I_EN_REG, 0x80)
+            self.__queue_register_write(txn, Constants.FM175XX_DIV_I_EN_REG, 0x00)
+        self.__queue_register_write(txn, Constants.FM175XX_WATER_LEVEL_REG, fifo_water_level)
 
-        self.__set_send_crc(cmd.send_crc_en)
-        self.__set_recv_crc(cmd.recv_crc_en)
-        self.__set_timeout(cmd.timeout)
+        self.__queue_register_write(txn, Constants.FM175XX_TX_MODE_REG, (tx_mode | 0x80) if cmd.send_crc_en else (tx_mode & ~0x80))
+        self.__queue_register_write(txn, Constants.FM175XX_RX_MODE_REG, (rx_mode | 0x80) if cmd.recv_crc_en else (rx_mode & ~0x80))
+        self.__queue_timeout(txn, cmd.timeout)
 
         # authentication
         if (cmd.cmd == Constants.FM175XX_CMD_MF_AUTHENT) :
-            self.__fifo_write(send_length, cmd.send_buff)
+            self.__queue_fifo_write(txn, send_length, cmd.send_buff)
             send_length = 0
-            self.__register_write(Constants.FM175XX_COMMAND_REG, cmd.cmd)
-            self.__register_write(Constants.FM175XX_BIT_FRAMING_REG, 0x80 | cmd.bits_to_send)
+            irq_mask = self.__command_irq_mask(cmd, send_length)
+            self.__queue_register_write(txn, Constants.FM175XX_COMMAND_REG, cmd.cmd)
+            self.__queue_register_write(txn, Constants.FM175XX_BIT_FRAMING_REG, 0x80 | cmd.bits_to_send)
 
         if (cmd.cmd == Constants.FM175XX_CMD_TRANSCEIVE):
-            self.__register_write(Constants.FM175XX_COMMAND_REG, cmd.cmd)
-            self.__register_write(Constants.FM175XX_BIT_FRAMING_REG, (cmd.bits_to_recv << 4) | cmd.bits_to_send)
+            self.__queue_register_write(txn, Constants.FM175XX_COMMAND_REG, cmd.cmd)
+            self.__queue_register_write(txn, Constants.FM175XX_BIT_FRAMING_REG, (cmd.bits_to_recv << 4) | cmd.bits_to_send)
 
-        last_time = time.time() * 1000
+        txn.execute()
+
+        deadline = time.monotonic() + (50 + cmd.timeout) / 1000
         while 1:
             # timeout
-            new_time = time.time() * 1000
-            if (new_time - last_time > 50 + cmd.timeout):
+            if (time.monotonic() > deadline):
                 result = Constants.FM175XX_CARD_TIMER_ERR
                 break
             irq = self.__register_read(Constants.FM175XX_COM_IRQ_REG)
 
+            # nothing to act on yet, wait for the chip instead of spinning on the SPI bus
+            if ((irq & irq_mask) == 0):
+                poll_interval = self.__wait_for_irq(deadline, poll_interval)
+                continue
+
             # timeout
             if (irq & 0x01):
                 self.__register_write(Constants.FM175XX_COM_IRQ_REG, 0x01)
@@ -242,6 +410,9 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
                         self.__fifo_write(send_length, cmd.send_buff)
                         send_length = 0
                     self.__register_modify(Constants.FM175XX_BIT_FRAMING_REG, 0x80, Constants.FM175XX_SET)
+                    irq_mask = self.__command_irq_mask(cmd, send_length)
+                    if (self.irq_pin is not None):
+                        self.__register_write(Constants.FM175XX_COM_I_EN_REG, 0x80 | irq_mask)
                 self.__register_write(Constants.FM175XX_COM_IRQ_REG, 0x04)
 
             # high level alert
@@ -260,10 +431,11 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
 
             # receice data
             if ((irq & 0x20) and (cmd.cmd == Constants.FM175XX_CMD_TRANSCEIVE)):
-                reg_data = self.__register_read(Constants.FM175XX_CONTROL_REG)
-                cmd.bits_recved = reg_data & 0x07
-                reg_data = self.__register_read(Constants.FM175XX_FIFO_LEVEL_REG)
-                receive_length = reg_data & 0x7F
+                control_index = self.__queue_register_read(txn, Constants.FM175XX_CONTROL_REG)
+                fifo_level_index = self.__queue_register_read(txn, Constants.FM175XX_FIFO_LEVEL_REG)
+                status_regs = txn.execute()
+                cmd.bits_recved = status_regs[control_index][1] & 0x07
+                receive_length = status_regs[fifo_level_index][1] & 0x7F
                 cmd.recv_buff[cmd.bytes_recved:cmd.bytes_recved+receive_length] = self.__fifo_read(receive_length)
                 cmd.bytes_recved += receive_length
                 if ((cmd.bytes_to_recv != cmd.bytes_recved) and (cmd.bytes_to_recv != 0)):
@@ -279,8 +451,10 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
                 if (cmd.cmd == Constants.FM175XX_CMD_TRANSCEIVE):
                     send_finish = 1
 
-        self.__register_modify(Constants.FM175XX_BIT_FRAMING_REG, 0x80, Constants.FM175XX_RESET)
-        self.__register_write(Constants.FM175XX_COMMAND_REG, Constants.FM175XX_CMD_IDLE)
+        bit_framing = self.__register_read(Constants.FM175XX_BIT_FRAMING_REG)
+        self.__queue_register_write(txn, Constants.FM175XX_BIT_FRAMING_REG, bit_framing & ~0x80)
+        self.__queue_register_write(txn, Constants.FM175XX_COMMAND_REG, Constants.FM175XX_CMD_IDLE)
+        txn.execute()
 
         ret = Fm175xxReturnVal()
         ret.err_code = result
@@ -457,7 +631,10 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
         (ret, ATQA) = self.__reader_a_wakeup()
         if (Constants.FM175XX_OK != ret):
             self.logger.error("wakeup err: %d", ret)
-            return (Constants.FM175XX_CARD_WAKEUP_ERR, [], [], [], [])
+            # Only silence means there is no tag, a garbled or colliding ATQA means something did answer
+            if (Constants.FM175XX_CARD_TIMER_ERR == ret):
+                return (Constants.FM175XX_CARD_WAKEUP_ERR, [], [], [], [])
+            return (ret, [], [], [], [])
 
         if ((ATQA[0] & 0xC0) == 0x00):
             cascade_level = 1
@@ -495,6 +672,13 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
 
         return (ret, UID, ATQA, BCC, SAK)
 
+    # Reader-A: re-activate a picc within the current session
+    def __reader_a_reactivate(self) -> int:
+        # Leave the crypto1 state of the previous authentication behind before talking to the tag again
+        self.__register_modify(Constants.FM175XX_STATUS_2_REG, 0x08, Constants.FM175XX_RESET)
+        (ret, _, _, _, _) = self.__reader_a_activate()
+        return ret
+
     # Reader-A: M1 authentication
     def __reader_a_mifare_auth(self, mode:int, sector:int, mifare_key:list, card_uid:list) -> int:
         ret = Constants.FM175XX_ERR
@@ -610,14 +794,23 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
 
         return ret
 
-    # Reader-A: M1, read all data
-    def __reader_a_m1_read_all_data(self, uid:list, auth_mode:int, auth_key : TagAuthentication, retry_times = 3) -> Fm175xxReturnVal:
+    # Reader-A: M1, read all data (or only the given blocks, leaving the rest zeroed)
+    def __reader_a_m1_read_all_data(self, uid:list, auth_mode:int, auth_key : TagAuthentication, read_plan : MifareClassicReadPlan | None = None, retry_times = 3) -> Fm175xxReturnVal:
         ret = Fm175xxReturnVal()
         card_data_tmp = [0] * Constants.FM175XX_M1_CARD_EEPROM_SIZE
         area = 0
 
-        # Traverse all sectors
-        for sector_no in range(Constants.FM175XX_M1_CARD_SECTORS):
+        if read_plan is None:
+            read_plan = MifareClassicReadPlan(list(range(Constants.FM175XX_M1_CARD_SECTORS * Constants.FM175XX_M1_CARD_BLOCKS_PER_SEC)))
+
+        blocks = set(read_plan.blocks)
+
+        # Traverse the requested sectors
+        for sector_no in read_plan.sectors():
+            # Sectors past the end of a 1K card are not there to read
+            if sector_no >= Constants.FM175XX_M1_CARD_SECTORS:
+                break
+
             # Authentication
             result = Constants.FM175XX_ERR
             #print(auth_key.hkdf_key_a[sector_no])
@@ -630,8 +823,11 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
                 self.logger.error( "------ M1 AUTH ERROR------\r\n" )
                 return ret
 
-            # Traverse all blocks
+            # Traverse the requested data blocks
             for block_no in range(Constants.FM175XX_M1_CARD_BLOCKS_PER_SEC - 1):
+                if (sector_no * Constants.FM175XX_M1_CARD_BLOCKS_PER_SEC + block_no) not in blocks:
+                    continue
+
                 result = Fm175xxReturnVal()
                 for _ in range(retry_times):
                     result = self.__reader_a_m1_block_read(sector_no * Constants.FM175XX_M1_CARD_BLOCKS_PER_SEC + block_no)
@@ -663,7 +859,7 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
         cmd.recv_crc_en = Constants.FM175XX_SET
         cmd.send_buff = outbuf
         cmd.recv_buff = inbuf
-        cmd.send_buff[0] = 0x30
+        cmd.send_buff[0] = Constants.FM175XX_RF_CMD_READ
         cmd.send_buff[1] = page
         cmd.bytes_to_send = 2
         cmd.bits_to_send = 0
@@ -682,9 +878,119 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
 
         return ret
 
+    # Reader-A: NTAG/Ultralight, get version (8 bytes)
+    def __reader_a_ultralight_get_version(self) -> Fm175xxReturnVal:
+        outbuf = [0] * 1
+        inbuf = [0] * Constants.FM175XX_ULTRALIGHT_VERSION_LEN
+        cmd = Fm175xxCmdMetaData()
+        ret = Fm175xxReturnVal()
+
+        cmd.send_crc_en = Constants.FM175XX_SET
+        cmd.recv_crc_en = Constants.FM175XX_SET
+        cmd.send_buff = outbuf
+        cmd.recv_buff = inbuf
+        cmd.send_buff[0] = Constants.FM175XX_RF_CMD_GET_VERSION
+        cmd.bytes_to_send = 1
+        cmd.bits_to_send = 0
+        cmd.bits_to_recv = 0
+        cmd.bytes_to_recv = Constants.FM175XX_ULTRALIGHT_VERSION_LEN
+        cmd.timeout = 10
+        cmd.cmd = Constants.FM175XX_CMD_TRANSCEIVE
+        result = self.__command_exe(cmd)
+        ret.err_code = result.err_code
+
+        if (Constants.FM175XX_OK == result.err_code):
+            if (len(result.out_data) == Constants.FM175XX_ULTRALIGHT_VERSION_LEN):
+                ret.out_data = result.out_data
+            else:
+                ret.err_code = Constants.FM175XX_CARD_COMM_ERR
+
+        return ret
+
+    # Reader-A: NTAG/Ultralight, read pages start_page to end_page (inclusive)
+    def __reader_a_ultralight_fast_read(self, start_page:int, end_page:int) -> Fm175xxReturnVal:
+        length = (end_page - start_page + 1) * Constants.FM175XX_NTAG215_BYTES_PER_PAGE
+        outbuf = [0] * 3
+        inbuf = [0] * length
+        cmd = Fm175xxCmdMetaData()
+        ret = Fm175xxReturnVal()
+
+        cmd.send_crc_en = Constants.FM175XX_SET
+        cmd.recv_crc_en = Constants.FM175XX_SET
+        cmd.send_buff = outbuf
+        cmd.recv_buff = inbuf
+        cmd.send_buff[0] = Constants.FM175XX_RF_CMD_FAST_READ
+        cmd.send_buff[1] = start_page
+        cmd.send_buff[2] = end_page
+        cmd.bytes_to_send = 3
+        cmd.bits_to_send = 0
+        cmd.bits_to_recv = 0
+        cmd.bytes_to_recv = length
+        cmd.timeout = 10
+        cmd.cmd = Constants.FM175XX_CMD_TRANSCEIVE
+        result = self.__command_exe(cmd)
+        ret.err_code = result.err_code
+
+        if (Constants.FM175XX_OK == result.err_code):
+            if (len(result.out_data) == length):
+                ret.out_data = result.out_data
+            else:
+                ret.err_code = Constants.FM175XX_CARD_COMM_ERR
+
+        return ret
+
+    # Reader-A: NTAG/Ultralight, GET_VERSION result and the total amount of pages of a known tag, None if it isn't one
+    def __reader_a_ultralight_total_pages(self) -> tuple[int, int | None]:
+        result = self.__reader_a_ultralight_get_version()
+        if (result.err_code != Constants.FM175XX_OK):
+            return (result.err_code, None)
+
+        version = (result.out_data[1], result.out_data[2], result.out_data[6])
+        total_pages = Constants.FM175XX_ULTRALIGHT_VERSION_TO_PAGES.get(version, None)
+        if (total_pages is None):
+            self.logger.debug("Unknown NTAG/Ultralight version: %s", bytes(result.out_data).hex().upper())
+
+        return (result.err_code, total_pages)
+
     # TODO: Maybe don't call it ultralight but the actual ISO specification
-    # Reader-A: NTAG215, read all data
-    def __reader_a_ultralight_read_all_data(self, retry_times = 3) -> Fm175xxReturnVal:
+    # Reader-A: NTAG/Ultralight, read all data
+    def __reader_a_ultralight_read_all_data(self, is_complete : Callable[[bytes], bool] | None = None, retry_times = 3) -> Fm175xxReturnVal:
+        ret = Fm175xxReturnVal()
+        (version_err, total_pages) = self.__reader_a_ultralight_total_pages()
+
+        if (total_pages is None):
+            # A tag that rejected GET_VERSION dropped back to idle and has to be woken up again.
+            # One that answered with an unknown version is still active and would ignore the WUPA
+            if (version_err != Constants.FM175XX_OK and self.__reader_a_reactivate() != Constants.FM175XX_OK):
+                ret.err_code = Constants.FM175XX_CARD_ACTIVATE_ERR
+                return ret
+
+            return self.__reader_a_ultralight_read_all_pages(is_complete, retry_times)
+
+        card_data_tmp = []
+
+        for start_page in range(0, total_pages, Constants.FM175XX_FAST_READ_MAX_PAGES):
+            end_page = min(start_page + Constants.FM175XX_FAST_READ_MAX_PAGES, total_pages) - 1
+            result = Fm175xxReturnVal()
+            for _ in range(retry_times):
+                result = self.__reader_a_ultralight_fast_read(start_page, end_page)
+                if (result.err_code == Constants.FM175XX_OK):
+                    break
+            if (result.err_code != Constants.FM175XX_OK):
+                ret.err_code = Constants.FM175XX_CARD_READ_ERR
+                return ret
+
+            card_data_tmp += result.out_data
+
+            if (is_complete is not None and is_complete(bytes(card_data_tmp))):
+                break
+
+        ret.err_code = Constants.FM175XX_OK
+        ret.out_data = card_data_tmp
+        return ret
+
+    # Reader-A: NTAG/Ultralight, read all data 4 pages at a time until the end of the tag
+    def __reader_a_ultralight_read_all_pages(self, is_complete : Callable[[bytes], bool] | None = None, retry_times = 3) -> Fm175xxReturnVal:
         ret = Fm175xxReturnVal()
         card_data_tmp = [0] * Constants.FM175XX_NTAG215_TOTAL_SIZE
 
@@ -707,6 +1013,10 @@ class Fm175xx(MifareClassicReader, MifareUltralightReader):
             if bytes_to_copy > 0:
                 card_data_tmp[area : area + bytes_to_copy] = result.out_data[0 : bytes_to_copy]
 
+            if (is_complete is not None and is_complete(bytes(card_data_tmp[0 : area + bytes_to_copy]))):
+                card_data_tmp = card_data_tmp[0 : area + bytes_to_copy]
+                break
+
         ret.err_code = Constants.FM175XX_OK
         ret.out_data = card_data_tmp
         return ret
\ No newline at end of file
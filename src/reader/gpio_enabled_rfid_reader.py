@@ -2,11 +2,12 @@ from reader.mifare_classic_reader import MifareClassicReader
 from reader.mifare_ultralight_reader import MifareUltralightReader
 from reader.rfid_reader import RfidReader
 from reader.scan_result import ScanResult
-from bus import OutputPin
+from reader.read_error import ReadError
+from bus import OutputPin, pin_state_lock
 from config import get_required_configurable_entity_by_name, TYPE_OUTPUT_PIN, TYPE_RFID_READER
-from typing import cast
+from typing import cast, Callable
 
-from tag.mifare_classic_tag_processor import TagAuthentication
+from tag.mifare_classic_tag_processor import TagAuthentication, MifareClassicReadPlan
 
 class GpioEnabledRfidReader(MifareClassicReader, MifareUltralightReader):
     def __init__(self, config: dict):
@@ -24,29 +25,51 @@ class GpioEnabledRfidReader(MifareClassicReader, MifareUltralightReader):
         for pin in self.gpio_pins_low:
             self.gpio_low.append(cast(OutputPin, get_required_configurable_entity_by_name(pin, TYPE_OUTPUT_PIN)))
 
+        self.pin_states : dict[OutputPin, bool] = {pin: True for pin in self.gpio_high}
+        self.pin_states.update({pin: False for pin in self.gpio_low})
+
+    def is_tag_present(self) -> bool:
+        return self.rfid_reader.is_tag_present()
+
+    def last_read_error(self) -> ReadError:
+        return self.rfid_reader.last_read_error()
+
+    def physical_reader(self) -> RfidReader:
+        return self.rfid_reader.physical_reader()
+
     def start_session(self):
-        for pin in self.gpio_high:
-            pin.set_high()
-        
-        for pin in self.gpio_low:
-            pin.set_low()
-        
-        self.rfid_reader.start_session()
+        # The coil select pins are shared between chips, other readers may only use them while they agree on their state
+        pin_state_lock.acquire(self.pin_states)
+
+        try:
+            self.rfid_reader.start_session()
+        except:
+            pin_state_lock.release(self.pin_states)
+            raise
 
     def end_session(self):
-        self.rfid_reader.end_session()
+        try:
+            self.rfid_reader.end_session()
+        finally:
+            pin_state_lock.release(self.pin_states)
 
     def scan(self) -> ScanResult | None:
         return self.rfid_reader.scan()
     
-    def read_mifare_classic(self, scan_result : ScanResult, keys: TagAuthentication) -> bytes|None:
+    def read_mifare_classic(self, scan_result : ScanResult, keys: TagAuthentication, read_plan: MifareClassicReadPlan|None = None) -> bytes|None:
+        if isinstance(self.rfid_reader, MifareClassicReader):
+            return self.rfid_reader.read_mifare_classic(scan_result, keys, read_plan)
+        
+        return None
+    
+    def probe_mifare_classic(self, scan_result : ScanResult, candidates: list[TagAuthentication]) -> int|None:
         if isinstance(self.rfid_reader, MifareClassicReader):
-            return self.rfid_reader.read_mifare_classic(scan_result, keys)
+            return self.rfid_reader.probe_mifare_classic(scan_result, candidates)
         
         return None
     
-    def read_mifare_ultralight(self, scan_result : ScanResult) -> bytes|None:
+    def read_mifare_ultralight(self, scan_result : ScanResult, is_complete : Callable[[bytes], bool]|None = None) -> bytes|None:
         if isinstance(self.rfid_reader, MifareUltralightReader):
-            return self.rfid_reader.read_mifare_ultralight(scan_result)
+            return self.rfid_reader.read_mifare_ultralight(scan_result, is_complete)
         
-        return None
\ No newline at end of file
+        return None
@@ -1,13 +1,19 @@
 from abc import abstractmethod
 from reader.rfid_reader import RfidReader
 from reader.scan_result import ScanResult
-from tag.mifare_classic_tag_processor import TagAuthentication
+from tag.mifare_classic_tag_processor import TagAuthentication, MifareClassicReadPlan
 
 class MifareClassicReader(RfidReader):
     def __init__(self, config: dict):
         super().__init__(config)
 
     @abstractmethod
-    def read_mifare_classic(self, scan_result : ScanResult, keys: TagAuthentication) -> bytes|None:
-        """Reads data from a Mifare Classic tag using the provided keys for authentication."""
-        raise NotImplementedError("Subclasses must implement this method")
\ No newline at end of file
+    def read_mifare_classic(self, scan_result : ScanResult, keys: TagAuthentication, read_plan: MifareClassicReadPlan|None = None) -> bytes|None:
+        """Reads data from a Mifare Classic tag using the provided keys for authentication. Only the blocks in the read plan are read if one is given."""
+        raise NotImplementedError("Subclasses must implement this method")
+
+    @abstractmethod
+    def probe_mifare_classic(self, scan_result : ScanResult, candidates: list[TagAuthentication]) -> int|None:
+        """Tries the sector 0 key of each candidate within the current session and returns the index of the first one that authenticates, or None if none do.
+        last_read_error() then tells whether the keys were rejected (FATAL) or the tag stopped answering."""
+        raise NotImplementedError("Subclasses must implement this method")
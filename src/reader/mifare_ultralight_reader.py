@@ -1,12 +1,13 @@
 from abc import abstractmethod
 from reader.rfid_reader import RfidReader
 from reader.scan_result import ScanResult
+from typing import Callable
 
 class MifareUltralightReader(RfidReader):
     def __init__(self, config: dict):
         super().__init__(config)
 
     @abstractmethod
-    def read_mifare_ultralight(self, scan_result : ScanResult) -> bytes|None:
-        """Reads data from a Mifare Ultralight tag."""
+    def read_mifare_ultralight(self, scan_result : ScanResult, is_complete : Callable[[bytes], bool]|None = None) -> bytes|None:
+        """Reads data from a Mifare Ultralight tag. Reading stops early once is_complete returns True for the data read so far."""
         raise NotImplementedError("Subclasses must implement this method")
\ No newline at end of file
@@ -0,0 +1,10 @@
+from enum import Enum
+
+class ReadError(Enum):
+    NONE = "none"
+    # Nothing answered the wakeup, there is no tag in the field
+    NO_TAG = "no_tag"
+    # CRC, parity, collision or timeout errors that usually go away on the next attempt
+    TRANSIENT = "transient"
+    # The tag answered but can't be read, e.g. none of the keys authenticate
+    FATAL = "fatal"
@@ -1,6 +1,9 @@
 from abc import abstractmethod
 from config import ConfigurableEntity, TYPE_RFID_READER
 from reader.scan_result import ScanResult
+from reader.read_error import ReadError
+from contextlib import contextmanager
+from typing import Iterator
 
 class RfidReader(ConfigurableEntity):
     def __init__(self, config : dict):
@@ -8,6 +11,7 @@ class RfidReader(ConfigurableEntity):
         self.name = config["__name"]
         self.slot = int(config.get("slot", 0))
         self.last_read_uid : str|None = None
+        self.read_error = ReadError.NONE
 
     @abstractmethod
     def start_session(self):
@@ -17,14 +21,36 @@ class RfidReader(ConfigurableEntity):
     def end_session(self):
         raise NotImplementedError("Subclasses must implement this method")
 
+    @contextmanager
+    def session(self) -> Iterator["RfidReader"]:
+        """Run start_session() and end_session() around a block, so scanning and reading can share the activated tag."""
+        self.start_session()
+
+        try:
+            yield self
+        finally:
+            self.end_session()
+
     @abstractmethod
     def scan(self) -> ScanResult | None:
         raise NotImplementedError("Subclasses must implement this method")
     
+    def is_tag_present(self) -> bool:
+        """Cheaply check whether any tag is in the field, without identifying it. Must be called within a session."""
+        return self.scan() is not None
+
+    def last_read_error(self) -> ReadError:
+        """Return why the last scan or read of the current session failed, or ReadError.NONE if nothing failed."""
+        return self.read_error
+
+    def physical_reader(self) -> "RfidReader":
+        """Return the reader that owns the RF chip. Readers sharing a physical reader can't be used at the same time."""
+        return self
+
     def is_same_tag(self, uid: str) -> bool:
         """Check if the given UID matches the last read UID."""
         return self.last_read_uid == uid
     
-    def set_last_read_uid(self, uid: str):
-        """Set the last read UID."""
+    def set_last_read_uid(self, uid: str|None):
+        """Set the last read UID, None once the tag is gone."""
         self.last_read_uid = uid
\ No newline at end of file
@@ -25,4 +25,14 @@ class ScanResult:
             "atqa": self.atqa.hex().upper(),
             "bcc": self.bcc.hex().upper(),
             "sak": self.sak.hex().upper()
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "ScanResult":
+        return ScanResult(
+            TagType[data["tag_type"]],
+            bytes.fromhex(data["uid"]),
+            bytes.fromhex(data["atqa"]),
+            bytes.fromhex(data["bcc"]),
+            bytes.fromhex(data["sak"])
+        )
\ No newline at end of file
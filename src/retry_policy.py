@@ -0,0 +1,27 @@
+from reader.read_error import ReadError
+import random
+
+class RetryPolicy:
+    def __init__(self, base_delay_seconds : float, max_delay_seconds : float, backoff_factor : float, jitter : float, no_tag_retries : int):
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.no_tag_retries = no_tag_retries
+
+    def next_delay(self, attempt : int, no_tag_attempts : int, error : ReadError) -> float | None:
+        """Return how long to wait before retrying after the given failed attempt (counting from 0), or None to give up."""
+        match error:
+            case ReadError.FATAL:
+                return None
+            case ReadError.NO_TAG if no_tag_attempts > self.no_tag_retries:
+                return None
+            case ReadError.TRANSIENT:
+                # A glitch on the RF link, the tag is there so try again right away
+                return 0
+
+        delay = self.base_delay_seconds * (self.backoff_factor ** attempt)
+
+        # Spread retries out so readers sharing coil pins don't keep colliding on the same schedule.
+        # Jittered before clamping, so no retry waits longer than the maximum
+        return min(self.max_delay_seconds, delay * random.uniform(1 - self.jitter, 1 + self.jitter))
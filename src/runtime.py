@@ -3,17 +3,24 @@ from config.configuration import default_configuration, Configuration
 from controllers.controller import Controller
 from tag.tag_types import TagType
 from tag.tag_processor import TagProcessor
-from tag.mifare_classic_tag_processor import MifareClassicTagProcessor
+from tag.mifare_classic_tag_processor import MifareClassicTagProcessor, TagAuthentication
 from tag.mifare_ultralight_tag_processor import MifareUltralightTagProcessor
+from tag.authentication_cache import TagAuthenticationCache
+from tag.processor_affinity import ProcessorAffinity
 from reader.mifare_classic_reader import MifareClassicReader
 from reader.mifare_ultralight_reader import MifareUltralightReader
 from reader.rfid_reader import RfidReader
 from exporters.exporter import Exporter, ExporterEvent
+from exporters.dispatcher import ExportDispatcher, DropPolicy
+from exporters.outbox import ExportOutbox
 from reader.scan_result import ScanResult
 from filament import GenericFilament
+from read_scheduler import ReadScheduler
+from retry_policy import RetryPolicy
+from reader.read_error import ReadError
 from typing import cast
-import time
 import logging
+import threading
 
 class Runtime:
     def __init__(self):
@@ -42,68 +49,196 @@ class Runtime:
         self.mifare_ultralight_processors = [processor for processor in self.tag_processors if isinstance(processor, MifareUltralightTagProcessor)]
 
         self.read_retries_left = [0] * len(self.rfid_readers)
+        # Counts start_reading_tag calls per slot, so a read can tell whether a new request came in while it ran
+        self.read_requests = [0] * len(self.rfid_readers)
+        self.read_retries_lock = threading.Lock()
+        self.scheduler = ReadScheduler(len(self.rfid_readers))
+        self.retry_policy = RetryPolicy(self.config.read_interval_seconds, self.config.retry_max_interval_seconds, self.config.retry_backoff_factor, self.config.retry_jitter, self.config.no_tag_retries)
+        self.retry_attempts = [0] * len(self.rfid_readers)
+        self.no_tag_attempts = [0] * len(self.rfid_readers)
+        self.authentication_cache = TagAuthenticationCache(self.config.key_cache_size)
+        self.processor_affinity = ProcessorAffinity(self.config.processor_affinity_size)
+        self.outbox = ExportOutbox(self.config.outbox_path, self.config.outbox_retry_min_seconds, self.config.outbox_retry_max_seconds) if self.config.outbox_path else None
+        self.export_dispatcher = ExportDispatcher(
+            self.config.export_workers,
+            self.config.export_queue_size,
+            DropPolicy(self.config.export_drop_policy),
+            self.outbox,
+            self.success_exporters + self.detection_exporters + self.error_exporters,
+            self.rfid_readers
+        )
 
     def start_reading_tag(self, slot: int):
         if slot < 0 or slot >= len(self.rfid_readers):
             logging.error(f"Invalid slot number: {slot}")
             return
         
-        self.read_retries_left[slot] = self.config.read_retries
+        with self.read_retries_lock:
+            self.read_retries_left[slot] = self.config.read_retries
+            self.read_requests[slot] += 1
+            self.retry_attempts[slot] = 0
+            self.no_tag_attempts[slot] = 0
+
+        self.scheduler.schedule(slot)
         logging.info(f"Received request to read tag on slot {slot} with {self.config.read_retries} retries")
 
     def loop(self):
+        if self.config.auto_read_mode:
+            for i in range(len(self.rfid_readers)):
+                self.scheduler.schedule(i)
+
+        if not self.config.parallel_readers or len(self.rfid_readers) <= 1:
+            self.__reader_worker(list(enumerate(self.rfid_readers)))
+            return
+
+        # Readers sharing an RF chip have to take turns, readers on different chips can scan at the same time
+        groups : dict[int, list[tuple[int, RfidReader]]] = {}
+        for i, reader in enumerate(self.rfid_readers):
+            groups.setdefault(id(reader.physical_reader()), []).append((i, reader))
+
+        workers = [threading.Thread(target=self.__reader_worker, args=(group,), daemon=True) for group in groups.values()]
+
+        for worker in workers:
+            worker.start()
+
+        for worker in workers:
+            worker.join()
+
+    def __reader_worker(self, readers: list[tuple[int, RfidReader]]):
+        readers_by_slot = dict(readers)
+
         while True:
-            for i, reader in enumerate(self.rfid_readers):
-                if self.config.auto_read_mode or self.read_retries_left[i] > 0:
-                    logging.debug(f"Processing reader {reader.name}, retries left: {self.read_retries_left[i]}")
-                    result = self.process_reader_single(reader)
-                    self.read_retries_left[i] -= 1
-                    scan_result = None
+            # Blocks without polling until a slot is requested or its next retry is due
+            i = self.scheduler.wait_for_due(list(readers_by_slot.keys()))
+
+            try:
+                self.process_slot(i, readers_by_slot[i])
+            except Exception as e:
+                # Only this slot pays for it, the other slots on the chip keep being read
+                logging.exception(f"Error while reading slot {i} on reader {readers_by_slot[i].name}: {e}")
+                self.__retry_after_exception(i, readers_by_slot[i])
+
+    def __retry_after_exception(self, i: int, reader: RfidReader):
+        if self.config.auto_read_mode:
+            self.scheduler.schedule(i, self.config.read_interval_seconds)
+            return
+
+        with self.read_retries_lock:
+            # The slot was already done with when it raised, e.g. while submitting its exports
+            if self.read_retries_left[i] <= 0:
+                return
+
+            self.read_retries_left[i] -= 1
+            retries_left = self.read_retries_left[i]
+
+        if retries_left > 0:
+            self.scheduler.schedule(i, self.config.read_interval_seconds)
+            return
 
-                    if result is not None:
-                        scan_result, filament = result
+        logging.warning(f"Failed to read from reader {reader.name}, no retries left")
 
-                        for exporter in self.detection_exporters:
-                                exporter.export_data(scan_result, filament, reader)
+        for exporter in self.error_exporters:
+            self.export_dispatcher.submit(exporter, None, None, reader)
 
-                        if filament is not None:
-                            logging.info(f"Processed tag with UID {scan_result.uid.hex().upper()} from reader {reader.name}")
+    def process_slot(self, i: int, reader: RfidReader):
+        with self.read_retries_lock:
+            retries_left = self.read_retries_left[i]
+            request = self.read_requests[i]
 
-                            for exporter in self.success_exporters:
-                                exporter.export_data(scan_result, filament, reader)
+        if not self.config.auto_read_mode and retries_left <= 0:
+            return
+
+        logging.debug(f"Processing reader {reader.name}, retries left: {retries_left}")
+        result = self.process_reader_single(reader)
+        scan_result = None
 
+        error = reader.last_read_error()
+        if result is not None and result[1] is not None:
+            error = ReadError.NONE
+        elif result is not None and error == ReadError.NONE:
+            # The reader reported no failure, so the tag was read in full (or no processor has keys for it) and nothing recognized it.
+            # A probe or read that failed on the RF link left TRANSIENT behind instead and is retried
+            error = ReadError.FATAL
+
+        if self.config.auto_read_mode:
+            self.scheduler.schedule(i, self.config.read_interval_seconds)
+        else:
+            with self.read_retries_lock:
+                if self.read_requests[i] != request:
+                    # start_reading_tag came in during this read, it already reset the retries and scheduled the slot again
+                    delay = None
+                else:
+                    # A tag that was found is done with, unless reading it failed on a glitch of the RF link
+                    if result is not None and error != ReadError.TRANSIENT:
                         self.read_retries_left[i] = 0
+                    else:
+                        self.read_retries_left[i] = max(self.read_retries_left[i] - 1, 0)
 
-                    elif self.read_retries_left[i] <= 0 and not self.config.auto_read_mode:
-                        logging.warning(f"Failed to read from reader {reader.name}, no retries left")
+                    self.no_tag_attempts[i] = self.no_tag_attempts[i] + 1 if error == ReadError.NO_TAG else 0
+                    delay = self.retry_policy.next_delay(self.retry_attempts[i], self.no_tag_attempts[i], error)
+                    self.retry_attempts[i] += 1
+
+                    if delay is None:
                         self.read_retries_left[i] = 0
 
-                        for exporter in self.error_exporters:
-                            exporter.export_data(scan_result, None, reader)
+                retries_left = self.read_retries_left[i]
+
+            if retries_left > 0 and delay is not None:
+                logging.debug(f"Retrying reader {reader.name} in {delay:.2f}s after {error.name} error")
+                self.scheduler.schedule(i, delay)
+
+                # Only a glitch while reading keeps a detected tag going, it is reported once the retries are done
+                if result is not None:
+                    return
 
-            time.sleep(self.config.read_interval_seconds)
+        if result is not None:
+            scan_result, filament = result
+
+            for exporter in self.detection_exporters:
+                    self.export_dispatcher.submit(exporter, scan_result, filament, reader)
+
+            if filament is not None:
+                logging.info(f"Processed tag with UID {scan_result.uid.hex().upper()} from reader {reader.name}")
+
+                for exporter in self.success_exporters:
+                    self.export_dispatcher.submit(exporter, scan_result, filament, reader)
+
+        elif retries_left <= 0 and not self.config.auto_read_mode:
+            logging.warning(f"Failed to read from reader {reader.name}, no retries left")
+
+            for exporter in self.error_exporters:
+                self.export_dispatcher.submit(exporter, scan_result, None, reader)
         
     def process_reader_single(self, reader: RfidReader) -> tuple[ScanResult, GenericFilament|None]|None:
-        reader.start_session()
-        scan_result = reader.scan()
-        reader.end_session()
-        if scan_result is None:
-            logging.debug("No tag detected")
-            return
-        
-        uid = scan_result.uid.hex()
-        
-        if self.config.auto_read_mode and reader.is_same_tag(uid):
-            logging.debug("Same tag detected as last read, skipping processing")
-            return
-        
-        logging.info(f"Detected tag type {scan_result.tag_type.name} with UID {scan_result.uid.hex().upper()}")
-
-        filament = None
-        if scan_result.tag_type == TagType.MifareClassic1k and isinstance(reader, MifareClassicReader):
-            filament = self.process_mifare_classic(reader, scan_result)
-        elif scan_result.tag_type == TagType.MifareUltralight and isinstance(reader, MifareUltralightReader):
-            filament = self.process_mifare_ultralight(reader, scan_result)
+        # Detection and reading share one session, so the tag stays selected and the carrier stays on in between
+        with reader.session():
+            if self.config.auto_read_mode and self.config.presence_check and reader.last_read_uid is not None:
+                # Only a removed tag needs attention, a WUPA is enough to tell it is still there
+                if reader.is_tag_present():
+                    logging.debug("Tag still present, skipping processing")
+                    return
+
+                logging.info(f"Tag with UID {reader.last_read_uid.upper()} removed from reader {reader.name}")
+                reader.set_last_read_uid(None)
+
+            scan_result = reader.scan()
+            if scan_result is None:
+                logging.debug("No tag detected")
+                return
+            
+            uid = scan_result.uid.hex()
+            
+            if self.config.auto_read_mode and reader.is_same_tag(uid):
+                logging.debug("Same tag detected as last read, skipping processing")
+                return
+            
+            logging.info(f"Detected tag type {scan_result.tag_type.name} with UID {scan_result.uid.hex().upper()}")
+
+            filament = None
+            if scan_result.tag_type == TagType.MifareClassic1k and isinstance(reader, MifareClassicReader):
+                filament = self.process_mifare_classic(reader, scan_result)
+            elif scan_result.tag_type == TagType.MifareUltralight and isinstance(reader, MifareUltralightReader):
+                filament = self.process_mifare_ultralight(reader, scan_result)
         
         if filament is None:
             logging.warning("Failed to read data from tag")
@@ -115,44 +250,75 @@ class Runtime:
         return (scan_result, filament)
 
     def process_mifare_classic(self, reader: MifareClassicReader, scan_result: ScanResult) -> GenericFilament | None:
-        for processor in self.mifare_classic_processors:
-            reader.start_session()
-
-            if reader.scan() == None:
-                logging.warning("Tag lost before reading")
-                reader.end_session()
-                continue
+        candidates : list[tuple[MifareClassicTagProcessor, TagAuthentication]] = []
 
-            logging.debug(f"Attempting to read with processor: {processor.name}")
-            auth = processor.authenticate_tag(scan_result)
+        for processor in self.processor_affinity.order(scan_result.uid, self.mifare_classic_processors):
+            auth = self.authentication_cache.get_authentication(processor, scan_result)
 
             if auth is None:
-                logging.warning("Authentication failed with processor, skipping processor")
-                reader.end_session()
+                logging.warning(f"Authentication failed with processor {processor.name}, skipping processor")
                 continue
 
-            card_data = reader.read_mifare_classic(scan_result, auth)
-            reader.end_session()
+            candidates.append((processor, auth))
+
+        first_attempt = True
+
+        while len(candidates) > 0:
+            # The scan that detected the tag left it selected, later attempts have to select it again
+            if not first_attempt and reader.scan() == None:
+                logging.warning("Tag lost before reading")
+                return None
+
+            first_attempt = False
+
+            # Find the processor whose keys open sector 0 in a single session, instead of a full read per processor
+            match = reader.probe_mifare_classic(scan_result, [auth for _, auth in candidates])
+
+            if match is None:
+                if reader.last_read_error() != ReadError.FATAL:
+                    # The RF link failed during the probe, that says nothing about the keys
+                    logging.warning("Tag did not respond while probing keys")
+                    return None
+
+                logging.warning("No processor could authenticate the tag")
+
+                for processor, _ in candidates:
+                    self.processor_affinity.record_attempt(scan_result.uid, processor, False)
+
+                return None
+
+            for processor, _ in candidates[:match]:
+                self.processor_affinity.record_attempt(scan_result.uid, processor, False)
+
+            processor, auth = candidates[match]
+            candidates = candidates[match + 1:]
+
+            logging.debug(f"Attempting to read with processor: {processor.name}")
+            card_data = reader.read_mifare_classic(scan_result, auth, processor.read_plan())
 
             if card_data is not None:
                 logging.debug(f"Read MIFARE Classic card data: {card_data.hex().upper()}")
-                return processor.process_tag(scan_result, card_data)
+                filament = processor.process_tag(scan_result, card_data)
+                self.processor_affinity.record_attempt(scan_result.uid, processor, filament is not None)
+
+                return filament
+            elif reader.last_read_error() != ReadError.FATAL:
+                # Sector 0 already opened with this processor's keys, the link failed rather than the processor.
+                # Leave the error for the retry policy, the remaining candidates would only fail the probe
+                logging.warning("Failed to read MIFARE Classic card data")
+                return None
             else:
                 logging.warning("Failed to read MIFARE Classic card data")
+                self.processor_affinity.record_attempt(scan_result.uid, processor, False)
                 continue
 
         return None
     
-    def process_mifare_ultralight(self, reader: MifareUltralightReader, scan_result: ScanResult) -> GenericFilament | None:
-        reader.start_session()
-
-        if reader.scan() == None:
-            logging.warning("Tag lost before reading")
-            reader.end_session()
-            return None
+    def __has_enough_ultralight_data(self, data: bytes) -> bool:
+        return all(processor.has_enough_data(data) for processor in self.mifare_ultralight_processors)
 
-        card_data = reader.read_mifare_ultralight(scan_result)
-        reader.end_session()
+    def process_mifare_ultralight(self, reader: MifareUltralightReader, scan_result: ScanResult) -> GenericFilament | None:
+        card_data = reader.read_mifare_ultralight(scan_result, self.__has_enough_ultralight_data)
 
         if card_data is not None:
             logging.debug(f"Read MIFARE Ultralight card data: {card_data.hex().upper()}")
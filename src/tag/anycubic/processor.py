@@ -11,11 +11,15 @@ class AnycubicTagProcessor(MifareUltralightTagProcessor):
     def __init__(self, config : dict):
         super().__init__(config)
 
+    def max_data_offset(self) -> int | None:
+        return 0x7C
+
     def process_tag(self, scan_result: ScanResult, data: bytes) -> GenericFilament | None:
         if scan_result.tag_type != TagType.MifareUltralight:
             raise ValueError("AnycubicTagProcessor can only process Mifare Ultralight tags")
         
-        if len(data) != 192:
+        # The filament data ends at 0x7C, NTAG213 tags are 180 bytes
+        if len(data) < 0x7C:
             return None
         
         if data[0x10:0x14] != b'\x7B\x00\x65\x00':
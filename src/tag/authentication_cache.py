@@ -0,0 +1,41 @@
+from collections import OrderedDict
+from reader.scan_result import ScanResult
+from tag.mifare_classic_tag_processor import MifareClassicTagProcessor, TagAuthentication
+import logging
+import threading
+
+class TagAuthenticationCache:
+    def __init__(self, max_entries : int):
+        self.max_entries = max_entries
+        self.entries : OrderedDict[tuple[str, bytes], TagAuthentication] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get_authentication(self, processor : MifareClassicTagProcessor, scan_result : ScanResult) -> TagAuthentication | None:
+        """Return the sector keys for a tag, only deriving them when this processor has not seen the UID recently."""
+        with self.lock:
+            key = (processor.name, scan_result.uid)
+            auth = self.entries.get(key, None)
+
+            if auth is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                logging.debug(f"Authentication cache hit for processor {processor.name} (hits: {self.hits}, misses: {self.misses})")
+                return auth
+
+            self.misses += 1
+            auth = processor.authenticate_tag(scan_result)
+
+            # Disabled processors return None; there is nothing worth remembering in that case
+            if auth is None or self.max_entries <= 0:
+                return auth
+
+            self.entries[key] = auth
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+            return auth
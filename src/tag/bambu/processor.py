@@ -1,6 +1,6 @@
 from filament import GenericFilament
 from reader.scan_result import ScanResult
-from tag.mifare_classic_tag_processor import MifareClassicTagProcessor, TagAuthentication
+from tag.mifare_classic_tag_processor import MifareClassicTagProcessor, TagAuthentication, MifareClassicReadPlan
 from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives import hashes
 from tag.tag_types import TagType
@@ -27,6 +27,18 @@ class BambuTagProcessor(MifareClassicTagProcessor):
         
         return self.__hkdf_create_key(scan_result.uid)
 
+    def read_plan(self) -> MifareClassicReadPlan | None:
+        return MifareClassicReadPlan.from_byte_ranges(
+            (Constants.MATERIAL_VARIANT_ID_POS, Constants.MATERIAL_ID_POS + Constants.MATERIAL_ID_LEN),
+            (Constants.FILAMENT_TYPE_POS, Constants.FILAMENT_TYPE_POS + Constants.FILAMENT_TYPE_LEN),
+            (Constants.DETAILED_FILAMENT_TYPE_POS, Constants.DETAILED_FILAMENT_TYPE_POS + Constants.DETAILED_FILAMENT_TYPE_LEN),
+            (Constants.COLOR_RGBA_POS, Constants.FILAMENT_DIAMETER_POS + Constants.FILAMENT_DIAMETER_LEN),
+            (Constants.DRYING_TEMP_POS, Constants.HOTEND_MIN_TEMP_POS + Constants.HOTEND_MIN_TEMP_LEN),
+            (Constants.TRAY_UID_POS, Constants.TRAY_UID_POS + Constants.TRAY_UID_LEN),
+            (Constants.PRODUCTION_DATETIME_POS, Constants.PRODUCTION_DATETIME_POS + Constants.PRODUCTION_DATETIME_LEN),
+            (Constants.FORMAT_IDENTIFIER_POS, Constants.SECOND_COLOR_POS + Constants.SECOND_COLOR_LEN),
+        )
+
     def process_tag(self, scan_result: ScanResult, data: bytes) -> GenericFilament | None:
         if not self.enabled:
             return None
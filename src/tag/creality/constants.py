@@ -37,4 +37,8 @@ CREALITY_FILAMENT_CODE_TO_DATA = {
 }
 
 CREALITY_SALT_HASH = "e544d94feb16159bbd7bc227df1e283eca1f38f2bb2015dfcc6161b74473b5c2"
-CREALITY_ENCRYPTION_KEY_HASH = "acec2106007458579ba522b25610b2cf509ae59d7879cb975f65c45228e5c9a1"
\ No newline at end of file
+CREALITY_ENCRYPTION_KEY_HASH = "acec2106007458579ba522b25610b2cf509ae59d7879cb975f65c45228e5c9a1"
+
+# Filament data lives in blocks 4-6 (sector 1)
+DATA_POS = 4 * 16
+DATA_LEN = 48
\ No newline at end of file
@@ -1,7 +1,7 @@
 from filament import GenericFilament
 from reader.scan_result import ScanResult
 from tag.tag_types import TagType
-from tag.mifare_classic_tag_processor import MifareClassicTagProcessor, TagAuthentication
+from tag.mifare_classic_tag_processor import MifareClassicTagProcessor, TagAuthentication, MifareClassicReadPlan
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 from . import constants as Constants
@@ -29,6 +29,9 @@ class CrealityTagProcessor(MifareClassicTagProcessor):
             raise ValueError("CrealityTagProcessor can only authenticate Mifare Classic 1K tags")
 
         return self.__hkdf_create_key(scan_result.uid)
+
+    def read_plan(self) -> MifareClassicReadPlan | None:
+        return MifareClassicReadPlan.from_byte_ranges((Constants.DATA_POS, Constants.DATA_POS + Constants.DATA_LEN))
     
     def process_tag(self, scan_result: ScanResult, data: bytes) -> GenericFilament | None:
         if not self.enabled:
@@ -37,7 +40,7 @@ class CrealityTagProcessor(MifareClassicTagProcessor):
         if scan_result.tag_type != TagType.MifareClassic1k:
             raise ValueError("CrealityTagProcessor can only process Mifare Classic 1K tags")
         
-        data_subset = data[64:64+48]
+        data_subset = data[Constants.DATA_POS:Constants.DATA_POS + Constants.DATA_LEN]
 
         test1 = data_subset[3]
         test2 = data_subset[17]
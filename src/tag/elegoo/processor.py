@@ -9,6 +9,9 @@ class ElegooTagProcessor(MifareUltralightTagProcessor):
     def __init__(self, config : dict):
         super().__init__(config)
 
+    def max_data_offset(self) -> int | None:
+        return 0x69
+
     def process_tag(self, scan_result: ScanResult, data: bytes) -> GenericFilament | None:
         if scan_result.tag_type != TagType.MifareUltralight:
             raise ValueError("AnycubicTagProcessor can only process Mifare Ultralight tags")
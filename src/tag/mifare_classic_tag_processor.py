@@ -5,11 +5,29 @@ import hashlib
 from reader.scan_result import ScanResult
 from tag.tag_processor import TagProcessor
 
+BYTES_PER_BLOCK = 16
+BLOCKS_PER_SECTOR = 4
+
 class TagAuthentication:
     def __init__(self, hkdf_key_a : list[list[int]], hkdf_key_b : list[list[int]]):
         self.hkdf_key_a = hkdf_key_a
         self.hkdf_key_b = hkdf_key_b
 
+class MifareClassicReadPlan:
+    def __init__(self, blocks : list[int]):
+        self.blocks = sorted(set(blocks))
+
+    def sectors(self) -> list[int]:
+        return sorted(set(block // BLOCKS_PER_SECTOR for block in self.blocks))
+
+    @staticmethod
+    def from_byte_ranges(*ranges : tuple[int, int]) -> "MifareClassicReadPlan":
+        """Create a plan covering the given (start, end) byte ranges of the tag image, end exclusive."""
+        blocks = []
+        for start, end in ranges:
+            blocks += range(start // BYTES_PER_BLOCK, (end + BYTES_PER_BLOCK - 1) // BYTES_PER_BLOCK)
+        return MifareClassicReadPlan(blocks)
+
 class MifareClassicTagProcessor(TagProcessor):
     def __init__(self, config : dict):
         super().__init__(config)
@@ -18,6 +36,10 @@ class MifareClassicTagProcessor(TagProcessor):
     def authenticate_tag(self, scan_result : ScanResult) -> TagAuthentication|None:
         """Return a list of sector keys for authentication."""
         raise NotImplementedError("Subclasses must implement this method")
+
+    def read_plan(self) -> MifareClassicReadPlan|None:
+        """Return the blocks this processor looks at, or None to read the whole tag. Blocks outside the plan are zero-filled."""
+        return None
     
     def load_key_from_config(self, key_name : str = "key") -> str|None:
         key = self.config.get(key_name, None)
@@ -2,4 +2,13 @@ from tag.tag_processor import TagProcessor
 
 class MifareUltralightTagProcessor(TagProcessor):
     def __init__(self, config: dict):
-        super().__init__(config)
\ No newline at end of file
+        super().__init__(config)
+
+    def max_data_offset(self) -> int|None:
+        """Return the offset just past the last byte this processor looks at, or None if it may need the whole tag."""
+        return None
+
+    def has_enough_data(self, data: bytes) -> bool:
+        """Return True once the data read so far is all this processor needs, so reading the tag can stop early."""
+        max_offset = self.max_data_offset()
+        return max_offset is not None and len(data) >= max_offset
\ No newline at end of file
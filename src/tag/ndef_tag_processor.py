@@ -34,6 +34,34 @@ class NdefTagProcessor(MifareUltralightTagProcessor):
             return None
         
         return self.process_ndef(scan_result, ndef_records)
+
+    def has_enough_data(self, data: bytes) -> bool:
+        # Walk the TLVs the same way __ndef_parse does and stop once the terminator TLV is in
+        start_offset = self.__ndef_start_offset(data)
+        if len(data) < start_offset + 4:
+            return False
+
+        # Without a capability container the parser gives up, so there is nothing more to read
+        if data[start_offset] != 0xE1:
+            return len(data) >= 20
+
+        offset = start_offset + 4
+        while offset + 2 <= len(data):
+            tag = data[offset]
+            if tag == 0xFE:
+                return True
+
+            tlv_len = data[offset + 1]
+            offset += 2
+            if tlv_len == 0xFF:
+                if offset + 2 > len(data):
+                    return False
+                tlv_len = (data[offset] << 8) | data[offset + 1]
+                offset += 2
+
+            offset += tlv_len
+
+        return offset < len(data) and data[offset] == 0xFE
     
     @abstractmethod
     def process_ndef(self, scan_result: ScanResult, ndef_records : list[NdefRecord]) -> GenericFilament | None:
@@ -57,6 +85,14 @@ class NdefTagProcessor(MifareUltralightTagProcessor):
 
         return '\n'.join(lines)
 
+    def __ndef_start_offset(self, data : bytes) -> int:
+        if len(data) > 12 and data[0] != 0xE1:
+            for i in range(min(16, len(data) - 4)):
+                if data[i] == 0xE1 and (data[i+1] == 0x10 or data[i+1] == 0x11 or data[i+1] == 0x40):
+                    return i
+
+        return 0
+
     def __ndef_parse(self, data_buf : bytes|list) -> tuple[int, list[NdefRecord]]:
         if None == data_buf or isinstance(data_buf, (list, bytes, bytearray)) == False:
             return NDEF_PARAMETER_ERR, []
@@ -69,13 +105,7 @@ class NdefTagProcessor(MifareUltralightTagProcessor):
 
             data_io = io.BytesIO(data)
 
-            start_offset = 0
-            if len(data) > 12 and data[0] != 0xE1:
-                for i in range(min(16, len(data) - 4)):
-                    if data[i] == 0xE1 and (data[i+1] == 0x10 or data[i+1] == 0x11 or data[i+1] == 0x40):
-                        start_offset = i
-                        break
-
+            start_offset = self.__ndef_start_offset(data)
             if start_offset > 0:
                 data_io.seek(start_offset)
 
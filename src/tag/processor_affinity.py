@@ -0,0 +1,52 @@
+from collections import OrderedDict
+from tag.tag_processor import TagProcessor
+from typing import TypeVar
+import threading
+
+T = TypeVar("T", bound=TagProcessor)
+
+class ProcessorAffinity:
+    def __init__(self, max_entries : int):
+        self.max_entries = max_entries
+        self.uid_to_processor : OrderedDict[bytes, str] = OrderedDict()
+        self.attempts : dict[str, int] = {}
+        self.successes : dict[str, int] = {}
+        self.lock = threading.RLock()
+
+    def success_rate(self, processor : TagProcessor) -> float:
+        with self.lock:
+            # Laplace smoothing, so processors without history rank as a coin flip instead of 0 or 1
+            return (self.successes.get(processor.name, 0) + 1) / (self.attempts.get(processor.name, 0) + 2)
+
+    def order(self, uid : bytes, processors : list[T]) -> list[T]:
+        """Order processors by how likely they are to read the given tag: the last processor that read this UID first, then by success rate."""
+        with self.lock:
+            # sorted() is stable, so processors with equal rates keep their configured order
+            ordered = sorted(processors, key=lambda processor: self.success_rate(processor), reverse=True)
+
+            preferred = self.uid_to_processor.get(uid, None)
+            if preferred is not None:
+                self.uid_to_processor.move_to_end(uid)
+                ordered.sort(key=lambda processor: processor.name != preferred)
+
+            return ordered
+
+    def record_attempt(self, uid : bytes, processor : TagProcessor, success : bool):
+        with self.lock:
+            self.attempts[processor.name] = self.attempts.get(processor.name, 0) + 1
+
+            if not success:
+                if self.uid_to_processor.get(uid, None) == processor.name:
+                    del self.uid_to_processor[uid]
+                return
+
+            self.successes[processor.name] = self.successes.get(processor.name, 0) + 1
+
+            if self.max_entries <= 0:
+                return
+
+            self.uid_to_processor[uid] = processor.name
+            self.uid_to_processor.move_to_end(uid)
+
+            while len(self.uid_to_processor) > self.max_entries:
+                self.uid_to_processor.popitem(last=False)
@@ -10,6 +10,9 @@ class TigerTagProcessor(MifareUltralightTagProcessor):
     def __init__(self, config: dict):
         super().__init__(config)
 
+    def max_data_offset(self) -> int | None:
+        return Constants.USER_DATA_BYTE_OFFSET + Constants.OFF_TIMESTAMP + 4
+
     def process_tag(self, scan_result: ScanResult, data: bytes) -> GenericFilament | None:
         if scan_result.tag_type != TagType.MifareUltralight:
             return None